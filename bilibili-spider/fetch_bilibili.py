@@ -1,30 +1,224 @@
 #!/usr/bin/env python3
 """
 B站视频数据爬虫
-使用Selenium获取指定用户的最新视频信息
+优先通过B站JSON接口（WBI签名）获取指定用户的最新视频信息，失败时回退到Selenium
 """
 
 import json
 import time
 import os
 import re
+import sys
+import hashlib
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode, urlparse
 from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 import logging
+from video_cache import VideoMetaCache
+
+# 可选：附加到常驻浏览器服务（../browser-service），服务不可用时本地启动Chrome
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'browser-service'))
+try:
+    from browser_service import BrowserServiceClient
+    from driver_cache import resolve_chromedriver
+    from page_ready import PageReadiness
+    from resource_blocking import ResourceBlocker, LOGGING_PREFS_CAPABILITY
+except ImportError:
+    BrowserServiceClient = None
+    resolve_chromedriver = None
+    PageReadiness = None
+    ResourceBlocker = None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# WBI签名使用的混淆表（来自B站前端，用于由img_key+sub_key生成mixin key）
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52
+]
+
+# mixin key 每天轮换，缓存超过该时长后重新获取
+WBI_KEY_TTL = 6 * 3600
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 在浏览器内一次性提取所有卡片字段，避免每个 find_element/get_attribute 都产生一次 WebDriver 往返
+# 参数: arguments[0] 卡片元素列表, arguments[1] 各字段选择器列表, arguments[2] 是否为用户空间主页
+CARD_EXTRACT_SCRIPT = """
+var cards = arguments[0], selectors = arguments[1], useSpace = arguments[2];
+
+function cascade(card, list, pick) {
+    // 与逐个 find_element 的语义一致：找到元素就取值，值满足条件时停止
+    var result = {found: false, value: null, selector: null};
+    for (var i = 0; i < list.length; i++) {
+        var el;
+        try { el = card.querySelector(list[i]); } catch (e) { el = null; }
+        if (!el) continue;
+        var picked = pick(el);
+        result.found = true;
+        result.value = picked[0];
+        if (picked[1]) {
+            result.selector = list[i];
+            break;
+        }
+    }
+    return result;
+}
+
+function text(el) { return (el.innerText || '').trim(); }
+function href(el) { return el.href || el.getAttribute('href') || ''; }
+
+return cards.map(function (card) {
+    var title = cascade(card, selectors.title, function (el) {
+        var t = el.getAttribute('title') || el.innerText || el.textContent;
+        return [t, !!(t && t.trim())];
+    });
+
+    var url = '';
+    if (useSpace && card.getAttribute('data-bvid')) {
+        url = 'https://www.bilibili.com/video/' + card.getAttribute('data-bvid');
+    }
+    var link = cascade(card, selectors.link, function (el) {
+        var h = href(el);
+        return [h, !!(h && (h.indexOf('video') >= 0 || h.indexOf('BV') >= 0))];
+    });
+    if (link.found) url = link.value;
+
+    var time = cascade(card, selectors.time, function (el) {
+        var t = text(el);
+        return [t, !!t];
+    });
+
+    var play = cascade(card, selectors.play, function (el) {
+        var t = text(el);
+        var ok = !!t && (t.indexOf('播放') >= 0 || t.indexOf('万') >= 0 || /^[0-9]+$/.test(t));
+        return [ok ? t : null, ok];
+    });
+
+    var cover = cascade(card, selectors.cover, function (el) {
+        var c = el.src || el.getAttribute('data-src');
+        return [c, !!c];
+    });
+
+    return {
+        title: title.value || '',
+        url: url || '',
+        href: href(card),
+        time: time.value || '',
+        play: play.value || '',
+        cover: cover.value || '',
+        text: card.innerText || '',
+        matched: {
+            title: title.selector,
+            link: link.selector,
+            time: time.selector,
+            play: play.selector,
+            cover: cover.selector
+        }
+    };
+});
+"""
+
+# 视频详情页就绪条件：内嵌状态已赋值或发布时间元素已渲染
+DETAIL_READY_CONDITION = """
+    var state = window.__INITIAL_STATE__;
+    if (state && state.videoData) return 'state';
+    return document.querySelector(".video-info-pubdate, .pubdate, [class*='pubdate']") ? 'dom' : null;
+"""
+
+# 统计刷新时写入数据集的字段 -> 视频信息接口 stat 中的字段
+STAT_FIELDS = {
+    'play_count': 'view',
+    'like_count': 'like',
+    'coin_count': 'coin'
+}
+
+# 用户动态流接口（offset 游标分页，从新到旧）
+DYNAMIC_FEED_API = "https://api.bilibili.com/x/polymer/web-dynamic/v1/feed/space"
+
+# 页面源码中内嵌的状态JSON的起始标记
+EMBEDDED_STATE_MARKERS = [
+    "window.__INITIAL_STATE__",
+    "window.__pinia"
+]
+
+# 按优先级返回第一个能匹配到元素的卡片选择器，用于对合并后的选择器列表做单次等待
+CARD_PROBE_SCRIPT = """
+var list = arguments[0];
+for (var i = 0; i < list.length; i++) {
+    try {
+        if (document.querySelector(list[i])) return list[i];
+    } catch (e) {}
+}
+return null;
+"""
+
+# 批量抓取时多个爬虫实例在不同线程中读改写同一个选择器统计文件
+SELECTOR_STATS_LOCK = threading.Lock()
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """原子写入JSON（先写本线程独有的临时文件再替换），并发写入时不会读到写了一半的文件"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+class HostRateLimiter:
+    """按主机限速：同一主机的请求间隔不小于 1/rate 秒，多个线程/爬虫实例共享"""
+    
+    def __init__(self, rate_per_host=5.0):
+        self.interval = 1.0 / rate_per_host if rate_per_host and rate_per_host > 0 else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+    
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_slot.get(host, 0))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class RateLimitedSession(requests.Session):
+    """发送请求前先经过按主机的限速器"""
+    
+    def __init__(self, rate_limiter=None):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+    
+    def request(self, method, url, *args, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait(urlparse(url).netloc)
+        return super().request(method, url, *args, **kwargs)
+
 class BilibiliSpider:
-    def __init__(self, user_id="472773672", use_dynamic=False, use_space=False):
+    def __init__(self, user_id="472773672", use_dynamic=False, use_space=False, use_api=False,
+                 enrich_concurrency=8, block_resources=True, incremental=False, known_run=3,
+                 rate_limiter=None, use_cache=True, detail_tabs=4):
         self.user_id = user_id
         # 支持从用户空间主页、动态页面或上传页面抓取
         if use_space:
@@ -35,44 +229,127 @@ class BilibiliSpider:
             self.base_url = f"https://space.bilibili.com/{user_id}/upload/video"
         self.use_dynamic = use_dynamic
         self.use_space = use_space
+        self.page_mode = "space" if use_space else ("dynamic" if use_dynamic else "upload")
+        self.use_api = use_api
+        # 批量补全发布时间时的并发数（同时也是连接池大小）
+        self.enrich_concurrency = max(1, enrich_concurrency)
+        # 详情页回退时同时打开的标签页数
+        self.detail_tabs = max(1, detail_tabs)
         self.output_file = "bilibili_videos.json"
         self.driver = None
+        self.browser_client = None
+        self.driver_resolve_info = None
+        self.readiness = None
+        # 屏蔽图片、字体、音视频和统计脚本的下载（只读取文本和属性值）
+        self.block_resources = block_resources and ResourceBlocker is not None
+        self.resource_blocker = None
+        # 增量模式：遇到连续 known_run 个已知视频即停止（容忍置顶视频），只补全新视频
+        self.incremental = incremental
+        self.known_run = max(1, known_run)
+        self.known_index_file = os.path.join(CACHE_DIR, f'known_bvids_{user_id}.json')
+        # 动态流游标状态：上次同步到的最新动态ID
+        self.dynamic_cursor_file = os.path.join(CACHE_DIR, f'dynamic_cursor_{user_id}.json')
+        self.used_mock_data = False
+        # BV号 -> 元数据的持久缓存：已知视频的发布时间不再请求接口
+        self.meta_cache = VideoMetaCache(os.path.join(CACHE_DIR, 'video_meta.sqlite3')) if use_cache else None
+        self.session = RateLimitedSession(rate_limiter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Referer': f'https://space.bilibili.com/{user_id}',
+            'Accept': 'application/json, text/plain, */*'
+        })
+        # 所有接口请求共享keep-alive连接池，避免每次请求重新握手
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.enrich_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.wbi_cache_file = os.path.join(CACHE_DIR, 'wbi_key.json')
+        # 记录各模式下每个字段上次命中的选择器，下次优先尝试
+        self.selector_stats_file = os.path.join(CACHE_DIR, 'selector_stats.json')
+        self.selector_stats = {}
+        self._mixin_key = None
         
-    def setup_driver(self):
-        """设置Chrome驱动"""
+    def attach_browser_service(self, service=None):
+        """尝试附加到常驻浏览器服务，成功时在独立标签页中工作"""
+        if BrowserServiceClient is None:
+            return False
+        
+        client = BrowserServiceClient(client_name='bilibili-spider')
         try:
-            # 尝试使用webdriver-manager自动下载
-            service = Service(ChromeDriverManager().install())
-            options = Options()
-            options.add_argument('--headless')  # 无头模式
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            capabilities = dict([LOGGING_PREFS_CAPABILITY]) if self.block_resources else None
+            self.driver = client.attach_driver(service=service, capabilities=capabilities)
+        except Exception as e:
+            logger.warning(f"附加到浏览器服务失败: {e}")
+            self.driver = None
+        
+        if not self.driver:
+            return False
+        self.browser_client = client
+        logger.info("已附加到常驻浏览器服务")
+        return True
+    
+    def close_driver(self):
+        """关闭驱动（附加到浏览器服务时只关闭自己的标签页并归还租约）"""
+        if not self.driver:
+            return
+        if self.browser_client:
+            self.browser_client.detach_driver(self.driver)
+            self.browser_client = None
+        else:
+            self.driver.quit()
+        self.driver = None
+    
+    def get_driver_service(self):
+        """解析chromedriver（优先复用本地缓存，Chrome未变化时不联网），返回Service或None"""
+        try:
+            if resolve_chromedriver is None:
+                return Service(ChromeDriverManager().install())
             
-            self.driver = webdriver.Chrome(service=service, options=options)
-            logger.info("Chrome驱动设置成功")
-            return True
+            driver_path, info = resolve_chromedriver()
+            self.driver_resolve_info = info
+            logger.info(f"ChromeDriver解析耗时 {info['resolve_seconds']}s "
+                        f"(缓存命中: {info['cache_hit']}, Chrome版本: {info['chrome_version']})")
+            return Service(driver_path) if driver_path else None
         except Exception as e:
             logger.warning(f"自动下载Chrome驱动失败: {e}")
-            
-            # 尝试使用系统ChromeDriver
+            return None
+    
+    def setup_driver(self):
+        """设置Chrome驱动"""
+        service = self.get_driver_service()
+        
+        # 优先使用常驻浏览器服务，避免每次冷启动Chrome
+        if self.attach_browser_service(service):
+            return True
+        
+        options = Options()
+        options.add_argument('--headless')  # 无头模式
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--window-size=1920,1080')
+        options.add_argument(f'--user-agent={USER_AGENT}')
+        # DOMContentLoaded 后即返回，数据是否就绪由 wait_ready 判断
+        options.page_load_strategy = 'eager'
+        if self.block_resources:
+            # 开启 performance 日志，用于统计被屏蔽的请求
+            options.set_capability(*LOGGING_PREFS_CAPABILITY)
+        
+        if service is not None:
             try:
-                options = Options()
-                options.add_argument('--headless')
-                options.add_argument('--no-sandbox')
-                options.add_argument('--disable-dev-shm-usage')
-                options.add_argument('--disable-gpu')
-                options.add_argument('--window-size=1920,1080')
-                options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-                
-                self.driver = webdriver.Chrome(options=options)
-                logger.info("使用系统ChromeDriver成功")
+                self.driver = webdriver.Chrome(service=service, options=options)
+                logger.info("Chrome驱动设置成功")
                 return True
-            except Exception as e2:
-                logger.error(f"系统ChromeDriver也失败: {e2}")
-                return False
+            except Exception as e:
+                logger.warning(f"使用解析到的Chrome驱动启动失败: {e}")
+        
+        # 尝试使用系统ChromeDriver
+        try:
+            self.driver = webdriver.Chrome(options=options)
+            logger.info("使用系统ChromeDriver成功")
+            return True
+        except Exception as e2:
+            logger.error(f"系统ChromeDriver也失败: {e2}")
+            return False
     
     def parse_publish_time(self, time_str):
         """解析B站相对时间为datetime对象"""
@@ -121,44 +398,124 @@ class BilibiliSpider:
         match = re.search(r'BV[a-zA-Z0-9]+', url)
         return match.group() if match else None
     
-    def get_video_publish_time_from_api(self, bvid):
-        """通过B站API获取视频发布时间"""
+    def fetch_video_view(self, bvid):
+        """请求视频信息接口，返回 data 字段（失败返回None），结果写入元数据缓存"""
         if not bvid:
             return None
         
         try:
             # 使用B站API获取视频信息
             api_url = f"https://api.bilibili.com/x/web-interface/view?bvid={bvid}"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Referer': 'https://www.bilibili.com/'
-            }
+            headers = {'Referer': 'https://www.bilibili.com/'}
             
-            response = requests.get(api_url, headers=headers, timeout=5)
+            response = self.session.get(api_url, headers=headers, timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 if data.get('code') == 0 and data.get('data'):
-                    # 获取发布时间（Unix时间戳）
-                    pubdate = data['data'].get('pubdate')
-                    if pubdate:
-                        # 转换为datetime对象
-                        publish_time = datetime.fromtimestamp(pubdate)
-                        logger.info(f"从API获取到视频 {bvid} 的发布时间: {publish_time.isoformat()}")
-                        return publish_time
+                    view = data['data']
+                    if self.meta_cache is not None:
+                        self.meta_cache.put(bvid, pubdate=view.get('pubdate'), title=view.get('title'),
+                                            stats=view.get('stat'))
+                    return view
         except Exception as e:
-            logger.warning(f"从API获取视频 {bvid} 发布时间失败: {e}")
+            logger.warning(f"从API获取视频 {bvid} 信息失败: {e}")
         
         return None
     
+    def get_video_publish_time_from_api(self, bvid):
+        """通过B站API获取视频发布时间（先查元数据缓存）"""
+        if not bvid:
+            return None
+        
+        if self.meta_cache is not None:
+            pubdate = self.meta_cache.get_pubdate(bvid)
+            if pubdate:
+                return datetime.fromtimestamp(pubdate)
+        
+        view = self.fetch_video_view(bvid)
+        # 获取发布时间（Unix时间戳）
+        pubdate = view.get('pubdate') if view else None
+        if pubdate:
+            publish_time = datetime.fromtimestamp(pubdate)
+            logger.info(f"从API获取到视频 {bvid} 的发布时间: {publish_time.isoformat()}")
+            return publish_time
+        
+        return None
+    
+    def wait_ready(self, condition_body, args=None, budget=0, timeout=10):
+        """等待页面所需数据出现（替代固定sleep），budget 为原固定等待时长，用于统计节省的时间"""
+        if self.readiness is None:
+            time.sleep(budget)
+            return None
+        return self.readiness.wait_for(condition_body, args, timeout=timeout, budget=budget)
+    
     def get_video_publish_time_from_page(self, video_url):
-        """从视频详情页获取发布时间"""
+        """从视频详情页获取发布时间（在独立标签页中打开，不影响列表页）"""
         if not video_url or not self.driver:
             return None
+        return self.fetch_publish_times_from_pages([video_url]).get(video_url)
+    
+    def start_detail_load(self, video_url):
+        """在当前（新开的）标签页中开始加载详情页，不等待加载完成"""
+        if self.resource_blocker is not None:
+            # setBlockedURLs 只作用于当前标签页，需在导航前对新标签页重新设置
+            self.resource_blocker.apply()
+        self.driver.execute_script("window.location.href = arguments[0];", video_url)
+    
+    def fetch_publish_times_from_pages(self, video_urls):
+        """
+        在最多 detail_tabs 个额外标签页中同时加载详情页并读取发布时间，返回 {url: datetime}
         
+        同一批标签页并行加载，逐个等待就绪并解析后关闭；列表页所在标签页始终不被导航
+        """
+        results = {}
+        urls = list(dict.fromkeys(url for url in video_urls if url))
+        if not urls or not self.driver:
+            return results
+        
+        start = time.time()
+        list_handle = self.driver.current_window_handle
+        for offset in range(0, len(urls), self.detail_tabs):
+            tabs = []
+            try:
+                for video_url in urls[offset:offset + self.detail_tabs]:
+                    self.driver.switch_to.new_window('tab')
+                    tabs.append((self.driver.current_window_handle, video_url))
+                    self.start_detail_load(video_url)
+                for handle, video_url in tabs:
+                    self.driver.switch_to.window(handle)
+                    publish_time = self.read_publish_time_from_detail(video_url)
+                    if publish_time:
+                        results[video_url] = publish_time
+            except Exception as e:
+                logger.warning(f"详情页标签页处理失败: {e}")
+            finally:
+                for handle, _ in tabs:
+                    try:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    except Exception:
+                        pass
+                self.driver.switch_to.window(list_handle)
+        
+        logger.info(f"详情页回退: {len(results)}/{len(urls)} 成功，"
+                    f"标签页并发 {min(self.detail_tabs, len(urls))}，耗时 {time.time() - start:.2f}s")
+        return results
+    
+    def read_publish_time_from_detail(self, video_url):
+        """在当前标签页（已导航到详情页）中读取发布时间"""
         try:
-            logger.info(f"访问视频详情页获取发布时间: {video_url}")
-            self.driver.get(video_url)
-            time.sleep(2)  # 等待页面加载
+            logger.info(f"读取视频详情页发布时间: {video_url}")
+            self.wait_ready(DETAIL_READY_CONDITION, budget=2)  # 等待发布时间数据就绪
+            
+            # 优先从内嵌状态JSON中读取精确的发布时间戳
+            bvid = self.extract_bvid(video_url)
+            for state in self.parse_embedded_state(self.driver.page_source):
+                for item in self.iter_state_videos(state):
+                    if item['bvid'] == bvid and item.get('pubdate'):
+                        publish_time = datetime.fromtimestamp(item['pubdate'])
+                        logger.info(f"从内嵌状态获取到发布时间: {publish_time.isoformat()}")
+                        return publish_time
             
             # 尝试多个选择器获取发布时间
             time_selectors = [
@@ -220,27 +577,386 @@ class BilibiliSpider:
         
         return None
     
-    def fetch_videos(self):
-        """获取B站视频数据"""
-        if not self.setup_driver():
-            logger.error("无法设置Chrome驱动，返回模拟数据")
-            return self.get_mock_data()
+    def fetch_publish_times_from_api(self, bvids):
+        """并发通过API批量获取发布时间，返回 {bvid: datetime}"""
+        unique_bvids = list(dict.fromkeys(bvid for bvid in bvids if bvid))
+        results = {}
+        if not unique_bvids:
+            return results
         
+        # 缓存命中的视频不发任何请求
+        if self.meta_cache is not None:
+            for bvid, pubdate in self.meta_cache.get_pubdates(unique_bvids).items():
+                results[bvid] = datetime.fromtimestamp(pubdate)
+        missing = [bvid for bvid in unique_bvids if bvid not in results]
+        if not missing:
+            logger.info(f"发布时间全部命中缓存: {len(results)} 个视频")
+            return results
+        
+        start = time.time()
+        workers = min(self.enrich_concurrency, len(missing))
+        resolved = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.fetch_video_view, bvid): bvid for bvid in missing}
+            for future in as_completed(futures):
+                view = future.result()
+                if view and view.get('pubdate'):
+                    results[futures[future]] = datetime.fromtimestamp(view['pubdate'])
+                    resolved += 1
+        
+        logger.info(f"并发补全发布时间: {resolved}/{len(missing)} 成功（缓存命中 {len(unique_bvids) - len(missing)}），"
+                    f"并发数 {workers}，耗时 {time.time() - start:.2f}s")
+        return results
+    
+    def enrich_publish_times(self, videos):
+        """批量补全缺少发布时间的视频：先收集全部BV号，并发查询后一次性合并"""
+        pending = {}
+        for video in videos:
+            if video.get('published_at'):
+                continue
+            bvid = self.extract_bvid(video.get('url'))
+            if bvid:
+                pending.setdefault(bvid, []).append(video)
+        
+        if not pending:
+            return videos
+        
+        resolved = self.fetch_publish_times_from_api(pending.keys())
+        
+        # API失败的视频统一排队，在独立标签页中并发从详情页获取
+        failed = {items[0]['url']: bvid for bvid, items in pending.items() if bvid not in resolved}
+        for video_url, publish_time in self.fetch_publish_times_from_pages(failed.keys()).items():
+            bvid = failed[video_url]
+            resolved[bvid] = publish_time
+            if self.meta_cache is not None:
+                self.meta_cache.put(bvid, pubdate=int(publish_time.timestamp()), title=pending[bvid][0].get('title'))
+        
+        for bvid, items in pending.items():
+            publish_time = resolved.get(bvid)
+            if publish_time:
+                for video in items:
+                    video['publish_time'] = publish_time.strftime('%Y-%m-%d %H:%M:%S')
+                    video['published_at'] = publish_time.isoformat()
+        
+        return videos
+    
+    def parse_count(self, value):
+        """将播放量等计数（12345、"1.2万"、"3亿"、"1,234"）统一为整数，无法解析返回None"""
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, (int, float)):
+            return int(value)
+        text = str(value or '').strip().replace(',', '')
+        match = re.match(r'^(\d+(?:\.\d+)?)\s*(万|亿)?$', text)
+        if not match:
+            return None
+        multiplier = {'万': 10 ** 4, '亿': 10 ** 8}.get(match.group(2), 1)
+        return int(round(float(match.group(1)) * multiplier))
+    
+    def fetch_stats(self, bvids, use_cache=True):
+        """
+        并发通过视频信息接口获取统计数据，返回 {bvid: {play_count, like_count, coin_count}}
+        
+        Args:
+            use_cache: 是否使用缓存中未过期的统计；为False时全部请求接口（结果仍写入缓存）
+        """
+        unique_bvids = list(dict.fromkeys(bvid for bvid in bvids if bvid))
+        results = {}
+        
+        def to_counts(stat):
+            counts = {field: self.parse_count(stat.get(key)) for field, key in STAT_FIELDS.items()}
+            return {field: count for field, count in counts.items() if count is not None}
+        
+        # 缓存中未过期的统计直接使用
+        missing = []
+        for bvid in unique_bvids:
+            stat = self.meta_cache.get_stats(bvid) if use_cache and self.meta_cache is not None else None
+            if stat:
+                results[bvid] = to_counts(stat)
+            else:
+                missing.append(bvid)
+        if not missing:
+            return results
+        
+        start = time.time()
+        workers = min(self.enrich_concurrency, len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.fetch_video_view, bvid): bvid for bvid in missing}
+            for future in as_completed(futures):
+                view = future.result()
+                if view and view.get('stat'):
+                    results[futures[future]] = to_counts(view['stat'])
+        
+        logger.info(f"统计数据刷新: 接口请求 {len(missing)} 个（缓存命中 {len(unique_bvids) - len(missing)}），"
+                    f"成功 {len(results)}/{len(unique_bvids)}，并发数 {workers}，耗时 {time.time() - start:.2f}s")
+        return results
+    
+    def refresh_stats(self, data_file=None):
+        """
+        刷新已保存数据集中视频的播放/点赞/投币数（不重新抓取列表页），只更新变化的字段；
+        计数与 make_video_record 一样写为字符串
+        
+        Args:
+            data_file: 数据集文件，默认 self.output_file；兼容批量抓取的合并文件
+        
+        Returns:
+            刷新报告，数据集不存在时返回None
+        """
+        data_file = data_file or self.output_file
         try:
-            logger.info(f"开始访问B站用户页面: {self.base_url}")
-            self.driver.get(self.base_url)
+            with open(data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"读取数据集 {data_file} 失败: {e}")
+            return None
+        
+        videos = [video for dataset in (data.get('users') or [data]) for video in dataset.get('videos') or []]
+        # 刷新要的是最新计数，不读统计缓存（TTL 内的缓存可能来自抓取时的补全，会让刷新变成空操作）
+        stats = self.fetch_stats((self.extract_bvid(video.get('url')) for video in videos), use_cache=False)
+        
+        now = datetime.now().isoformat()
+        report = {"videos": len(videos), "refreshed": 0, "changed_videos": 0, "changed_fields": 0}
+        for video in videos:
+            counts = stats.get(self.extract_bvid(video.get('url')))
+            if not counts:
+                continue
+            report["refreshed"] += 1
+            # 与列表抓取一致，计数字段以字符串保存（前端按 string 类型读取）
+            changes = {field: str(count) for field, count in counts.items() if video.get(field) != str(count)}
+            if changes:
+                video.update(changes)
+                video["stats_updated_at"] = now
+                report["changed_videos"] += 1
+                report["changed_fields"] += len(changes)
+        
+        if report["changed_videos"]:
+            data["stats_refreshed_at"] = now
+            output_file, self.output_file = self.output_file, data_file
+            try:
+                self.save_data(data)
+            finally:
+                self.output_file = output_file
+        logger.info(f"统计刷新完成: {report}")
+        return report
+    
+    def get_mixin_key(self, refresh=False):
+        """获取WBI签名用的mixin key（内存+磁盘缓存）"""
+        if self._mixin_key and not refresh:
+            return self._mixin_key
+        
+        if not refresh:
+            try:
+                with open(self.wbi_cache_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if time.time() - cached.get('fetched_at', 0) < WBI_KEY_TTL and cached.get('mixin_key'):
+                    self._mixin_key = cached['mixin_key']
+                    return self._mixin_key
+            except (OSError, ValueError):
+                pass
+        
+        # nav接口未登录时返回 code=-101，但 wbi_img 依然可用
+        response = self.session.get("https://api.bilibili.com/x/web-interface/nav", timeout=5)
+        wbi_img = response.json().get('data', {}).get('wbi_img', {})
+        img_key = wbi_img.get('img_url', '').rsplit('/', 1)[-1].split('.')[0]
+        sub_key = wbi_img.get('sub_url', '').rsplit('/', 1)[-1].split('.')[0]
+        raw_key = img_key + sub_key
+        if len(raw_key) < 64:
+            raise ValueError("nav接口未返回有效的wbi_img")
+        
+        self._mixin_key = ''.join(raw_key[i] for i in MIXIN_KEY_ENC_TAB)[:32]
+        try:
+            write_json_atomic(self.wbi_cache_file, {'mixin_key': self._mixin_key, 'fetched_at': int(time.time())})
+        except OSError as e:
+            logger.warning(f"写入WBI缓存失败: {e}")
+        return self._mixin_key
+    
+    def sign_wbi_params(self, params, refresh=False):
+        """为请求参数添加 wts 和 w_rid 签名"""
+        mixin_key = self.get_mixin_key(refresh=refresh)
+        signed = dict(params)
+        signed['wts'] = int(time.time())
+        # 按key排序，并过滤值中的 !'()* 字符
+        signed = {
+            k: ''.join(ch for ch in str(v) if ch not in "!'()*")
+            for k, v in sorted(signed.items())
+        }
+        query = urlencode(signed)
+        signed['w_rid'] = hashlib.md5((query + mixin_key).encode()).hexdigest()
+        return signed
+    
+    def ensure_buvid_cookie(self):
+        """获取buvid3/buvid4 cookie，未携带时接口容易触发风控(-352)"""
+        if self.session.cookies.get('buvid3'):
+            return
+        try:
+            response = self.session.get("https://api.bilibili.com/x/frontend/finger/spi", timeout=5)
+            data = response.json().get('data', {})
+            if data.get('b_3'):
+                self.session.cookies.set('buvid3', data['b_3'], domain='.bilibili.com')
+            if data.get('b_4'):
+                self.session.cookies.set('buvid4', data['b_4'], domain='.bilibili.com')
+        except Exception as e:
+            logger.warning(f"获取buvid cookie失败: {e}")
+    
+    def fetch_arc_page(self, page=1, page_size=30):
+        """请求用户投稿列表接口的一页，返回 data 字段；被拒绝时返回None"""
+        self.ensure_buvid_cookie()
+        params = {'mid': self.user_id, 'ps': page_size, 'pn': page, 'order': 'pubdate'}
+        
+        for attempt in range(2):
+            # 第二次尝试时强制刷新mixin key（缓存的key可能已轮换）
+            signed = self.sign_wbi_params(params, refresh=attempt > 0)
+            response = self.session.get(
+                "https://api.bilibili.com/x/space/wbi/arc/search", params=signed, timeout=10
+            )
+            if response.status_code != 200:
+                logger.warning(f"投稿列表接口返回状态码 {response.status_code}")
+                return None
             
-            # 等待页面加载
-            wait = WebDriverWait(self.driver, 10)
+            result = response.json()
+            if result.get('code') == 0:
+                return result.get('data') or {}
+            logger.warning(f"投稿列表接口拒绝请求: code={result.get('code')} message={result.get('message')}")
+        
+        return None
+    
+    def make_video_record(self, bvid, title, timestamp, play_count, cover_url):
+        """由结构化字段（接口或内嵌JSON）构造与 save_data 一致的视频格式"""
+        published_at = datetime.fromtimestamp(timestamp) if timestamp else None
+        cover_url = cover_url or ""
+        if cover_url.startswith('//'):
+            cover_url = 'https:' + cover_url
+        
+        return {
+            "title": (title or "无标题").strip(),
+            "url": f"https://www.bilibili.com/video/{bvid}",
+            "publish_time": published_at.strftime('%Y-%m-%d %H:%M:%S') if published_at else "",
+            "published_at": published_at.isoformat() if published_at else None,
+            "play_count": str(play_count or 0),
+            "cover_url": cover_url,
+            "fetched_at": datetime.now().isoformat()
+        }
+    
+    def remember_videos(self, videos):
+        """把接口或内嵌状态中带精确发布时间的视频写入元数据缓存"""
+        if self.meta_cache is None:
+            return
+        records = []
+        for video in videos:
+            bvid = self.extract_bvid(video.get('url'))
+            if bvid and video.get('published_at'):
+                pubdate = int(datetime.fromisoformat(video['published_at']).timestamp())
+                records.append((bvid, pubdate, video.get('title'), None))
+        self.meta_cache.put_many(records)
+    
+    def parse_arc_item(self, item):
+        """将投稿列表接口中的一条记录转换为与 save_data 一致的视频格式"""
+        bvid = item.get('bvid')
+        if not bvid:
+            return None
+        return self.make_video_record(bvid, item.get('title'), item.get('created'),
+                                      item.get('play'), item.get('pic'))
+    
+    def parse_embedded_state(self, page_source):
+        """从页面源码中解码内嵌的状态JSON（window.__INITIAL_STATE__ 等），返回状态对象列表"""
+        states = []
+        if not page_source:
+            return states
+        
+        decoder = json.JSONDecoder()
+        for marker in EMBEDDED_STATE_MARKERS:
+            index = page_source.find(marker)
+            if index < 0:
+                continue
+            brace = page_source.find('{', index + len(marker))
+            if brace < 0:
+                continue
+            try:
+                state, _ = decoder.raw_decode(page_source, brace)
+                states.append(state)
+            except ValueError as e:
+                logger.warning(f"解析内嵌状态 {marker} 失败: {e}")
+        return states
+    
+    def iter_state_videos(self, node):
+        """递归遍历状态对象，产出所有形如视频记录的字典"""
+        if isinstance(node, dict):
+            bvid = node.get('bvid')
+            if isinstance(bvid, str) and bvid.startswith('BV') and node.get('title'):
+                yield node
+            for value in node.values():
+                if isinstance(value, (dict, list)):
+                    yield from self.iter_state_videos(value)
+        elif isinstance(node, list):
+            for value in node:
+                yield from self.iter_state_videos(value)
+    
+    def parse_state_video(self, item):
+        """将内嵌状态中的一条视频记录转换为视频格式，非本用户的视频返回None"""
+        owner_mid = item.get('mid') or (item.get('owner') or {}).get('mid')
+        if owner_mid and str(owner_mid) != str(self.user_id):
+            return None
+        
+        stat = item.get('stat') or {}
+        timestamp = item.get('pubdate') or item.get('created') or item.get('ctime')
+        play_count = stat.get('view') if stat.get('view') is not None else item.get('play')
+        return self.make_video_record(item['bvid'], item.get('title'), timestamp,
+                                      play_count, item.get('pic') or item.get('cover'))
+    
+    def extract_videos_from_state(self, page_source, max_videos=30):
+        """从一次 page_source 快照中提取全部视频（标题、BV号、发布时间、播放量、封面）"""
+        videos = []
+        seen_bvids = set()
+        for state in self.parse_embedded_state(page_source):
+            for item in self.iter_state_videos(state):
+                if item['bvid'] in seen_bvids:
+                    continue
+                video_data = self.parse_state_video(item)
+                if not video_data:
+                    continue
+                seen_bvids.add(item['bvid'])
+                videos.append(video_data)
+                if len(videos) >= max_videos:
+                    return videos
+        return videos
+    
+    def fetch_videos_from_api(self, max_videos=30):
+        """通过JSON接口获取视频数据（不启动浏览器），失败时返回None"""
+        try:
+            logger.info(f"通过接口获取B站用户 {self.user_id} 的投稿列表")
+            data = self.fetch_arc_page(page=1, page_size=max_videos)
+            if data is None:
+                return None
             
-            # 等待页面加载完成
-            time.sleep(3)  # 给页面一些时间加载
+            vlist = (data.get('list') or {}).get('vlist') or []
+            videos = []
+            for item in vlist:
+                video_data = self.parse_arc_item(item)
+                if video_data:
+                    videos.append(video_data)
+            
+            if not videos:
+                logger.warning("接口未返回任何视频")
+                return None
             
-            # 等待视频列表加载，尝试多个选择器
-            video_elements = []
-            if self.use_space:
-                # 用户空间主页的选择器
-                selectors = [
+            logger.info(f"从接口获取到 {len(videos)} 个视频")
+            self.remember_videos(videos)
+            return {
+                "user_id": self.user_id,
+                "total_videos": len(videos),
+                "fetched_at": datetime.now().isoformat(),
+                "videos": videos
+            }
+        except Exception as e:
+            logger.warning(f"通过接口获取视频失败: {e}")
+            return None
+    
+    def get_selectors(self):
+        """返回当前页面模式下卡片及各字段的候选选择器（按优先级排序）"""
+        if self.use_space:
+            # 用户空间主页的选择器
+            return {
+                "card": [
                     ".space-video-item",
                     ".video-item",
                     "[class*='space-video']",
@@ -253,10 +969,56 @@ class BilibiliSpider:
                     ".item[class*='video']",
                     "[data-aid]",  # B站视频的data-aid属性
                     "[data-bvid]"  # B站视频的data-bvid属性
+                ],
+                "title": [
+                    ".title",
+                    ".video-title",
+                    "a[title]",
+                    "[class*='title']",
+                    ".bili-video-card__info--tit",
+                    "h3",
+                    "h4",
+                    ".name",
+                    "[class*='name']"
+                ],
+                "link": [
+                    "a[href*='video']",
+                    "a[href*='BV']",
+                    "a[href*='/video/']",
+                    "[data-bvid]",
+                    "[data-aid]",
+                    "a"
+                ],
+                "time": [
+                    ".time",
+                    ".publish-time",
+                    "[class*='time']",
+                    "[class*='date']",
+                    ".bili-video-card__info--date",
+                    ".pubdate",
+                    "[class*='pubdate']"
+                ],
+                "play": [
+                    ".play",
+                    ".play-count",
+                    "[class*='play']",
+                    "[class*='view']",
+                    "[class*='stats']",
+                    ".bili-video-card__stats--item"
+                ],
+                "cover": [
+                    "img[src]",
+                    "[class*='cover'] img",
+                    "[class*='thumbnail'] img",
+                    "[class*='pic'] img",
+                    ".pic img",
+                    "img"
                 ]
-            elif self.use_dynamic:
-                # 动态页面的选择器
-                selectors = [
+            }
+        elif self.use_dynamic:
+            # 动态页面的选择器
+            return {
+                "card": [
                     ".bili-dyn-item[data-type='8']",  # 视频动态类型
                     ".bili-dyn-item-video",
                     ".dyn-item[data-type='8']",
@@ -265,10 +1027,63 @@ class BilibiliSpider:
                     ".dyn-card-video",
                     "[class*='video-card']",
                     "[class*='dyn-video']"
+                ],
+                "title": [
+                    ".bili-dyn-content__text",
+                    ".dyn-content__text",
+                    ".bili-dyn-title",
+                    ".dyn-title",
+                    ".bili-video-card__info--tit",
+                    ".video-title",
+                    ".title",
+                    "a[title]",
+                    "[class*='title']",
+                    "h3",
+                    "h4"
+                ],
+                "link": [
+                    "a[href*='video']",
+                    "a[href*='BV']",
+                    ".bili-dyn-card-video a",
+                    ".dyn-card-video a",
+                    "a[href*='/video/']",
+                    "a"
+                ],
+                "time": [
+                    ".bili-dyn-pub__text",
+                    ".dyn-pub__text",
+                    ".bili-dyn-time",
+                    ".dyn-time",
+                    ".bili-video-card__info--date",
+                    ".publish-time",
+                    ".time",
+                    "[class*='time']",
+                    "[class*='date']"
+                ],
+                "play": [
+                    ".bili-dyn-card-video__stats",
+                    ".dyn-card-video__stats",
+                    ".bili-video-card__stats--item",
+                    ".play-count",
+                    "[class*='play']",
+                    "[class*='view']",
+                    "[class*='stats']"
+                ],
+                "cover": [
+                    ".bili-dyn-card-video__cover img",
+                    ".dyn-card-video__cover img",
+                    ".bili-dyn-card-video img",
+                    ".dyn-card-video img",
+                    "img[src]",
+                    "[class*='cover'] img",
+                    "[class*='thumbnail'] img",
+                    "img"
                 ]
-            else:
-                # 上传页面的选择器
-                selectors = [
+            }
+        else:
+            # 上传页面的选择器
+            return {
+                "card": [
                     ".bili-video-card",
                     ".video-card",
                     ".upload-video-item",
@@ -277,307 +1092,527 @@ class BilibiliSpider:
                     ".video-list-item",
                     "li[class*='video']",
                     ".item[class*='video']"
-                ]
+                ],
+                "title": [
+                    ".bili-video-card__info--tit",
+                    ".video-title",
+                    ".title",
+                    "a[title]",
+                    "[class*='title']",
+                    "h3",
+                    "h4"
+                ],
+                "link": ["a", "a[href*='video']", "a[href*='BV']"],
+                "time": [
+                    ".bili-video-card__info--date",
+                    ".publish-time",
+                    ".time",
+                    "[class*='time']",
+                    "[class*='date']"
+                ],
+                "play": [
+                    ".bili-video-card__stats--item",
+                    ".play-count",
+                    "[class*='play']",
+                    "[class*='view']"
+                ],
+                "cover": ["img", "img[src]", "[class*='cover'] img", "[class*='thumbnail'] img"]
+            }
+    
+    def load_selector_stats(self):
+        """读取持久化的选择器命中记录"""
+        try:
+            with open(self.selector_stats_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_selector_stats(self, stats):
+        """保存选择器命中记录"""
+        try:
+            write_json_atomic(self.selector_stats_file, stats, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"保存选择器命中记录失败: {e}")
+    
+    def get_ordered_selectors(self):
+        """按历史命中情况重排选择器：上次胜出的排最前，其余按命中次数降序"""
+        selectors = self.get_selectors()
+        mode_stats = self.load_selector_stats().get(self.page_mode, {})
+        
+        ordered = {}
+        for field, candidates in selectors.items():
+            field_stats = mode_stats.get(field, {})
+            winner = field_stats.get('winner')
+            wins = field_stats.get('wins', {})
+            # sorted 是稳定排序，命中次数相同的保持原有优先级
+            ordered[field] = sorted(
+                candidates,
+                key=lambda sel: (sel != winner, -wins.get(sel, 0))
+            )
+        return ordered
+    
+    def record_selector_winners(self, card_selector, cards, timings):
+        """记录本次运行各字段胜出的选择器及耗时"""
+        winners = {"card": card_selector}
+        for field in ("title", "link", "time", "play", "cover"):
+            counts = {}
+            for card in cards:
+                selector = (card.get("matched") or {}).get(field)
+                if selector:
+                    counts[selector] = counts.get(selector, 0) + 1
+            if counts:
+                winners[field] = max(counts, key=counts.get)
+        
+        # 读改写整个文件期间持锁，避免并发的爬虫实例互相覆盖命中记录
+        with SELECTOR_STATS_LOCK:
+            stats = self.load_selector_stats()
+            mode_stats = stats.setdefault(self.page_mode, {})
+            for field, selector in winners.items():
+                if not selector:
+                    continue
+                field_stats = mode_stats.setdefault(field, {"winner": None, "wins": {}})
+                field_stats["winner"] = selector
+                field_stats["wins"][selector] = field_stats["wins"].get(selector, 0) + 1
             
-            for selector in selectors:
-                try:
-                    video_elements = wait.until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector))
-                    )
-                    if video_elements:
-                        logger.info(f"使用选择器 '{selector}' 找到 {len(video_elements)} 个视频元素")
-                        break
-                except:
+            mode_stats["last_run"] = dict(timings, winners=winners, at=datetime.now().isoformat())
+            self.save_selector_stats(stats)
+        self.selector_stats = mode_stats["last_run"]
+    
+    def wait_for_cards(self, card_selectors, timeout=10):
+        """对合并后的卡片选择器列表做一次有上限的等待，返回 (命中的选择器, 元素列表)"""
+        selector = None
+        use_probe = self.readiness is None
+        if self.readiness is not None:
+            # DOM 变更驱动：任一卡片选择器出现即返回（替代原先固定的3秒等待）
+            selector = self.readiness.wait_for_selector(card_selectors, timeout=timeout, budget=3)
+            if self.readiness.last_error is not None:
+                # 就绪脚本本身执行失败（如页面 CSP 禁止 new Function），改用轮询
+                logger.warning(f"就绪检测脚本执行失败，改用轮询等待: {self.readiness.last_error}")
+                use_probe = True
+        if use_probe:
+            if self.readiness is None:
+                time.sleep(3)  # 给页面一些时间加载
+            try:
+                selector = WebDriverWait(self.driver, timeout, poll_frequency=0.25).until(
+                    lambda driver: driver.execute_script(CARD_PROBE_SCRIPT, card_selectors)
+                )
+            except WebDriverException:
+                selector = None
+        if selector:
+            return selector, self.driver.find_elements(By.CSS_SELECTOR, selector)
+        
+        # 如果还是没找到，尝试直接查找
+        logger.warning("使用标准选择器未找到视频，尝试通用查找")
+        for selector in card_selectors:
+            try:
+                elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            except WebDriverException:
+                continue
+            if elements:
+                logger.info(f"使用通用查找找到 {len(elements)} 个视频元素")
+                return selector, elements
+        return None, []
+    
+    def extract_cards(self, video_elements, selectors):
+        """在浏览器内一次性执行所有字段的选择器级联，返回卡片原始记录列表"""
+        if not video_elements:
+            return []
+        field_selectors = {field: selectors[field] for field in ("title", "link", "time", "play", "cover")}
+        return self.driver.execute_script(CARD_EXTRACT_SCRIPT, video_elements, field_selectors, self.use_space) or []
+    
+    def build_video_records(self, cards):
+        """将浏览器返回的卡片原始记录整理为视频数据（补全、过滤、去重）"""
+        videos = []
+        seen_urls = set()  # 用于去重
+        
+        for i, card in enumerate(cards):
+            try:
+                card_text = card.get("text") or ""
+                
+                title = card.get("title") or ""
+                if not title:
+                    title = card_text[:50] if card_text else "无标题"
+                
+                video_url = card.get("url") or card.get("href") or ""
+                # 如果没有找到链接，尝试从文本中提取BV号
+                if not video_url:
+                    bv_match = re.search(r'BV[a-zA-Z0-9]+', card_text)
+                    if bv_match:
+                        video_url = f"https://www.bilibili.com/video/{bv_match.group()}"
+                
+                # 解析发布时间为ISO格式（列表页没有的在循环结束后批量补全）
+                publish_time = card.get("time") or ""
+                published_at = self.parse_publish_time(publish_time) if publish_time else None
+                
+                play_count = card.get("play") or "0"
+                cover_url = card.get("cover") or ""
+                
+                # 过滤：如果 url 为空，跳过这条数据（必须要有可点击的链接）
+                if not video_url or video_url.strip() == "":
+                    logger.info(f"跳过无链接视频: {title[:30]}... (url为空)")
+                    continue
+                
+                # 去重：如果URL已存在，跳过
+                if video_url in seen_urls:
+                    logger.info(f"跳过重复视频: {title[:30]}...")
                     continue
+                
+                seen_urls.add(video_url)
+                
+                video_data = {
+                    "title": title.strip(),
+                    "url": video_url,
+                    "publish_time": publish_time,
+                    "published_at": published_at.isoformat() if published_at else None,
+                    "play_count": play_count,
+                    "cover_url": cover_url,
+                    "fetched_at": datetime.now().isoformat()
+                }
+                
+                videos.append(video_data)
+                logger.info(f"获取视频 {len(videos)}: {title[:30]}... (封面: {cover_url[:50] if cover_url else 'N/A'})")
+                
+            except Exception as e:
+                logger.warning(f"解析视频 {i+1} 失败: {e}")
+                continue
+        
+        return videos
+    
+    def iter_video_pages(self, start_page=1, page_size=30, page_delay=1.0):
+        """逐页产出 (页码, 视频列表, 投稿总数)，直到最后一页；每次只在内存中保留一页"""
+        page = start_page
+        while True:
+            data = self.fetch_arc_page(page=page, page_size=page_size)
+            if data is None:
+                raise RuntimeError(f"第 {page} 页请求被拒绝")
             
-            # 如果还是没找到，尝试直接查找
-            if not video_elements:
-                logger.warning("使用标准选择器未找到视频，尝试通用查找")
-                for selector in selectors:
-                    video_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    if video_elements:
-                        logger.info(f"使用通用查找找到 {len(video_elements)} 个视频元素")
-                        break
+            vlist = (data.get('list') or {}).get('vlist') or []
+            total = (data.get('page') or {}).get('count') or 0
+            videos = [video for video in (self.parse_arc_item(item) for item in vlist) if video]
+            yield page, videos, total
             
-            videos = []
-            seen_urls = set()  # 用于去重
+            if not vlist or page * page_size >= total:
+                return
+            page += 1
+            time.sleep(page_delay)  # 控制翻页频率，避免触发风控
+    
+    def load_backfill_state(self, state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_backfill_state(self, state_file, state):
+        """原子写入断点状态（先写临时文件再替换）"""
+        tmp_file = state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, state_file)
+    
+    def backfill(self, sink_file=None, page_size=30, flush_every=5):
+        """
+        分页回填全部投稿，逐条追加写入JSONL，可从上次完成的页继续
+        
+        Args:
+            sink_file: JSONL输出文件，默认 bilibili_videos_{user_id}.jsonl
+            page_size: 每页数量
+            flush_every: 每写入多少页落盘一次并记录断点
+        """
+        sink_file = sink_file or f"bilibili_videos_{self.user_id}.jsonl"
+        state_file = sink_file + '.state'
+        state = self.load_backfill_state(state_file)
+        
+        if state and not os.path.exists(sink_file):
+            logger.warning(f"找不到输出文件 {sink_file}，忽略断点从头回填")
+            state = {}
+        if state.get('completed'):
+            logger.info(f"回填已完成（共 {state.get('written', 0)} 条），如需重新回填请删除 {state_file}")
+            return state
+        if state and state.get('page_size') != page_size:
+            raise ValueError(f"断点记录的每页数量为 {state.get('page_size')}，与本次 {page_size} 不一致")
+        # 没有断点的已有文件不是本次回填写出的，不能截断覆盖
+        if not state and os.path.exists(sink_file):
+            raise ValueError(f"输出文件 {sink_file} 已存在但没有断点记录 {state_file}，请换一个 --sink 或先移走该文件")
+        if state and os.path.getsize(sink_file) < state.get('offset', 0):
+            raise ValueError(f"输出文件 {sink_file} 比断点记录的位置 {state.get('offset')} 还短，无法继续")
+        
+        start_page = state.get('last_page', 0) + 1
+        written = state.get('written', 0)
+        
+        if state:
+            # 截断到上次落盘位置，丢弃崩溃前写了一半、尚未记录断点的页
+            f = open(sink_file, 'r+', encoding='utf-8')
+            f.seek(state['offset'])
+            f.truncate()
+        else:
+            f = open(sink_file, 'w', encoding='utf-8')
+            # 立即记录初始断点，首次落盘前中断时重新运行也能识别这个文件
+            self.save_backfill_state(state_file, {
+                'page_size': page_size, 'last_page': 0, 'offset': 0,
+                'written': 0, 'total': None, 'completed': False
+            })
+        with f:
+            if start_page > 1:
+                logger.info(f"从第 {start_page} 页继续回填（已写入 {written} 条）")
             
-            for i, element in enumerate(video_elements[:30]):  # 获取前30个视频（去重后可能更少）
-                try:
-                    # 获取视频标题 - 尝试多个选择器
-                    title = ""
-                    if self.use_space:
-                        # 用户空间主页的标题选择器
-                        title_selectors = [
-                            ".title",
-                            ".video-title",
-                            "a[title]",
-                            "[class*='title']",
-                            ".bili-video-card__info--tit",
-                            "h3",
-                            "h4",
-                            ".name",
-                            "[class*='name']"
-                        ]
-                    elif self.use_dynamic:
-                        # 动态页面的标题选择器
-                        title_selectors = [
-                            ".bili-dyn-content__text",
-                            ".dyn-content__text",
-                            ".bili-dyn-title",
-                            ".dyn-title",
-                            ".bili-video-card__info--tit",
-                            ".video-title",
-                            ".title",
-                            "a[title]",
-                            "[class*='title']",
-                            "h3",
-                            "h4"
-                        ]
-                    else:
-                        # 上传页面的标题选择器
-                        title_selectors = [
-                            ".bili-video-card__info--tit",
-                            ".video-title",
-                            ".title",
-                            "a[title]",
-                            "[class*='title']",
-                            "h3",
-                            "h4"
-                        ]
-                    for selector in title_selectors:
-                        try:
-                            title_element = element.find_element(By.CSS_SELECTOR, selector)
-                            title = title_element.get_attribute("title") or title_element.text or title_element.get_attribute("textContent")
-                            if title and title.strip():
-                                break
-                        except:
-                            continue
-                    
-                    if not title:
-                        title = element.text[:50] if element.text else "无标题"
-                    
-                    # 获取视频链接 - 尝试多个选择器
-                    video_url = ""
-                    if self.use_space:
-                        # 用户空间主页的链接选择器
-                        link_selectors = [
-                            "a[href*='video']",
-                            "a[href*='BV']",
-                            "a[href*='/video/']",
-                            "[data-bvid]",
-                            "[data-aid]",
-                            "a"
-                        ]
-                        # 如果找到data-bvid或data-aid，构建链接
-                        if not video_url:
-                            try:
-                                bvid = element.get_attribute("data-bvid")
-                                if bvid:
-                                    video_url = f"https://www.bilibili.com/video/{bvid}"
-                            except:
-                                pass
-                    elif self.use_dynamic:
-                        # 动态页面的链接选择器
-                        link_selectors = [
-                            "a[href*='video']",
-                            "a[href*='BV']",
-                            ".bili-dyn-card-video a",
-                            ".dyn-card-video a",
-                            "a[href*='/video/']",
-                            "a"
-                        ]
-                    else:
-                        # 上传页面的链接选择器
-                        link_selectors = ["a", "a[href*='video']", "a[href*='BV']"]
-                    for selector in link_selectors:
-                        try:
-                            link_element = element.find_element(By.CSS_SELECTOR, selector)
-                            video_url = link_element.get_attribute("href")
-                            if video_url and ("video" in video_url or "BV" in video_url):
-                                break
-                        except:
-                            continue
-                    
-                    if not video_url:
-                        # 尝试从元素本身获取链接
-                        try:
-                            video_url = element.get_attribute("href")
-                        except:
-                            video_url = ""
-                    
-                    # 如果没有找到链接，尝试构建
-                    if not video_url:
-                        # 尝试从文本中提取BV号
-                        bv_match = re.search(r'BV[a-zA-Z0-9]+', element.text or "")
-                        if bv_match:
-                            video_url = f"https://www.bilibili.com/video/{bv_match.group()}"
-                    
-                    # 获取发布时间 - 尝试多个选择器
-                    publish_time = ""
-                    if self.use_space:
-                        # 用户空间主页的时间选择器
-                        time_selectors = [
-                            ".time",
-                            ".publish-time",
-                            "[class*='time']",
-                            "[class*='date']",
-                            ".bili-video-card__info--date",
-                            ".pubdate",
-                            "[class*='pubdate']"
-                        ]
-                    elif self.use_dynamic:
-                        # 动态页面的时间选择器
-                        time_selectors = [
-                            ".bili-dyn-pub__text",
-                            ".dyn-pub__text",
-                            ".bili-dyn-time",
-                            ".dyn-time",
-                            ".bili-video-card__info--date",
-                            ".publish-time",
-                            ".time",
-                            "[class*='time']",
-                            "[class*='date']"
-                        ]
-                    else:
-                        # 上传页面的时间选择器
-                        time_selectors = [
-                            ".bili-video-card__info--date",
-                            ".publish-time",
-                            ".time",
-                            "[class*='time']",
-                            "[class*='date']"
-                        ]
-                    for selector in time_selectors:
-                        try:
-                            time_element = element.find_element(By.CSS_SELECTOR, selector)
-                            publish_time = time_element.text
-                            if publish_time:
-                                break
-                        except:
-                            continue
-                    
-                    # 解析发布时间为ISO格式
-                    published_at = self.parse_publish_time(publish_time) if publish_time else None
-                    
-                    # 如果从列表页没有获取到发布时间，尝试从视频详情页或API获取
-                    if not published_at and video_url:
-                        logger.info(f"尝试获取视频 {i+1} 的真实发布时间...")
-                        published_at = self.get_video_publish_time(video_url)
-                        if published_at:
-                            # 更新 publish_time 文本
-                            publish_time = published_at.strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # 获取播放量 - 尝试多个选择器
-                    play_count = "0"
-                    if self.use_space:
-                        # 用户空间主页的播放量选择器
-                        play_selectors = [
-                            ".play",
-                            ".play-count",
-                            "[class*='play']",
-                            "[class*='view']",
-                            "[class*='stats']",
-                            ".bili-video-card__stats--item"
-                        ]
-                    elif self.use_dynamic:
-                        # 动态页面的播放量选择器
-                        play_selectors = [
-                            ".bili-dyn-card-video__stats",
-                            ".dyn-card-video__stats",
-                            ".bili-video-card__stats--item",
-                            ".play-count",
-                            "[class*='play']",
-                            "[class*='view']",
-                            "[class*='stats']"
-                        ]
-                    else:
-                        # 上传页面的播放量选择器
-                        play_selectors = [
-                            ".bili-video-card__stats--item",
-                            ".play-count",
-                            "[class*='play']",
-                            "[class*='view']"
-                        ]
-                    for selector in play_selectors:
-                        try:
-                            play_element = element.find_element(By.CSS_SELECTOR, selector)
-                            play_text = play_element.text
-                            if play_text and ("播放" in play_text or "万" in play_text or play_text.isdigit()):
-                                play_count = play_text
-                                break
-                        except:
-                            continue
-                    
-                    # 获取视频封面 - 尝试多个选择器
-                    cover_url = ""
-                    if self.use_space:
-                        # 用户空间主页的封面选择器
-                        cover_selectors = [
-                            "img[src]",
-                            "[class*='cover'] img",
-                            "[class*='thumbnail'] img",
-                            "[class*='pic'] img",
-                            ".pic img",
-                            "img"
-                        ]
-                    elif self.use_dynamic:
-                        # 动态页面的封面选择器
-                        cover_selectors = [
-                            ".bili-dyn-card-video__cover img",
-                            ".dyn-card-video__cover img",
-                            ".bili-dyn-card-video img",
-                            ".dyn-card-video img",
-                            "img[src]",
-                            "[class*='cover'] img",
-                            "[class*='thumbnail'] img",
-                            "img"
-                        ]
-                    else:
-                        # 上传页面的封面选择器
-                        cover_selectors = ["img", "img[src]", "[class*='cover'] img", "[class*='thumbnail'] img"]
-                    for selector in cover_selectors:
-                        try:
-                            cover_element = element.find_element(By.CSS_SELECTOR, selector)
-                            cover_url = cover_element.get_attribute("src") or cover_element.get_attribute("data-src")
-                            if cover_url:
-                                break
-                        except:
-                            continue
-                    
-                    # 过滤：如果 url 为空，跳过这条数据（必须要有可点击的链接）
-                    if not video_url or video_url.strip() == "":
-                        logger.info(f"跳过无链接视频: {title[:30]}... (url为空)")
-                        continue
-                    
-                    # 去重：如果URL已存在，跳过
-                    if video_url in seen_urls:
-                        logger.info(f"跳过重复视频: {title[:30]}...")
+            pages_since_flush = 0
+            last_page = start_page - 1
+            total = state.get('total')
+            for page, videos, total in self.iter_video_pages(start_page, page_size):
+                for video in videos:
+                    f.write(json.dumps(video, ensure_ascii=False) + '\n')
+                written += len(videos)
+                last_page = page
+                pages_since_flush += 1
+                logger.info(f"回填第 {page} 页: {len(videos)} 条（累计 {written}/{total}）")
+                
+                if pages_since_flush >= flush_every:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.save_backfill_state(state_file, {
+                        'page_size': page_size, 'last_page': last_page, 'offset': f.tell(),
+                        'written': written, 'total': total, 'completed': False
+                    })
+                    pages_since_flush = 0
+            
+            f.flush()
+            os.fsync(f.fileno())
+            state = {
+                'page_size': page_size, 'last_page': last_page, 'offset': f.tell(),
+                'written': written, 'total': total, 'completed': True
+            }
+            self.save_backfill_state(state_file, state)
+        
+        logger.info(f"回填完成: 共写入 {written} 条到 {sink_file}")
+        return state
+    
+    def load_known_index(self):
+        """读取已知BV号索引 {bvid: published_at}，不存在时从已有数据文件重建"""
+        try:
+            with open(self.known_index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        index = {}
+        for video in self.load_existing_videos():
+            bvid = self.extract_bvid(video.get('url'))
+            if bvid:
+                index[bvid] = video.get('published_at')
+        return index
+    
+    def save_known_index(self, videos):
+        """用合并后的数据集刷新已知BV号索引"""
+        index = {}
+        for video in videos:
+            bvid = self.extract_bvid(video.get('url'))
+            if bvid:
+                index[bvid] = video.get('published_at')
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(self.known_index_file, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+        except OSError as e:
+            logger.warning(f"保存已知视频索引失败: {e}")
+    
+    def load_existing_videos(self):
+        """读取已保存的数据集中的视频列表"""
+        try:
+            with open(self.output_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('videos') or []
+        except (OSError, ValueError, AttributeError):
+            return []
+    
+    def filter_new_videos(self, videos):
+        """按列表顺序遍历，遇到连续 known_run 个已知视频即停止，返回其间的新视频"""
+        known = self.load_known_index()
+        new_videos = []
+        run = 0
+        for video in videos:
+            if self.extract_bvid(video.get('url')) in known:
+                run += 1
+                if run >= self.known_run:
+                    break
+                continue
+            run = 0
+            new_videos.append(video)
+        
+        logger.info(f"增量模式: 列表 {len(videos)} 个视频中新视频 {len(new_videos)} 个（已知 {len(known)} 个）")
+        return new_videos
+    
+    def merge_videos(self, new_videos):
+        """将新视频合并进已有数据集（按URL去重，按发布时间倒序）"""
+        new_urls = {video['url'] for video in new_videos}
+        merged = list(new_videos) + [
+            video for video in self.load_existing_videos() if video.get('url') not in new_urls
+        ]
+        merged.sort(key=lambda video: video.get('published_at') or '', reverse=True)
+        return {
+            "user_id": self.user_id,
+            "total_videos": len(merged),
+            "fetched_at": datetime.now().isoformat(),
+            "videos": merged
+        }
+    
+    def fetch_dynamic_page(self, offset=''):
+        """
+        请求动态流接口的一页，返回 (data字段, 响应字节数)；
+        被拒绝或请求失败（网络错误、WBI密钥获取失败、非JSON响应）时 data 为None
+        """
+        params = {'host_mid': self.user_id, 'offset': offset, 'timezone_offset': -480,
+                  'features': 'itemOpusStyle'}
+        received = 0
+        
+        try:
+            self.ensure_buvid_cookie()
+            for attempt in range(2):
+                signed = self.sign_wbi_params(params, refresh=attempt > 0)
+                response = self.session.get(DYNAMIC_FEED_API, params=signed, timeout=10)
+                received += len(response.content)
+                if response.status_code != 200:
+                    logger.warning(f"动态流接口返回状态码 {response.status_code}")
+                    return None, received
+                
+                result = response.json()
+                if result.get('code') == 0:
+                    return result.get('data') or {}, received
+                logger.warning(f"动态流接口拒绝请求: code={result.get('code')} message={result.get('message')}")
+        except Exception as e:
+            logger.warning(f"动态流接口请求失败: {e}")
+        
+        return None, received
+    
+    def parse_dynamic_item(self, item):
+        """将动态流中的投稿视频动态转换为视频格式，其他类型的动态返回None"""
+        if item.get('type') != 'DYNAMIC_TYPE_AV':
+            return None
+        modules = item.get('modules') or {}
+        archive = ((modules.get('module_dynamic') or {}).get('major') or {}).get('archive') or {}
+        if not archive.get('bvid'):
+            return None
+        pub_ts = (modules.get('module_author') or {}).get('pub_ts')
+        play_count = (archive.get('stat') or {}).get('play')
+        return self.make_video_record(archive['bvid'], archive.get('title'), pub_ts,
+                                      play_count, archive.get('cover'))
+    
+    def fetch_dynamic_delta(self, max_pages=10):
+        """
+        沿 offset 游标从新到旧遍历动态流，遇到上次同步到的动态ID即停止（不启动浏览器）
+        
+        Returns:
+            (新视频列表, 新游标状态, 统计报告)；首次运行时最多读取 max_pages 页作为基线
+        """
+        state = self.load_backfill_state(self.dynamic_cursor_file)
+        last_id = int(state.get('last_dynamic_id') or 0)
+        newest_id = last_id
+        videos = []
+        report = {"pages": 0, "bytes": 0, "items": 0, "new_videos": 0, "reached_last_seen": False}
+        offset = ''
+        exhausted = False
+        
+        while report["pages"] < max_pages:
+            data, received = self.fetch_dynamic_page(offset)
+            report["bytes"] += received
+            if data is None:
+                break
+            report["pages"] += 1
+            
+            for item in data.get('items') or []:
+                dynamic_id = int(item.get('id_str') or 0)
+                # 置顶动态可能早于上次同步的位置，不作为停止条件
+                pinned = ((item.get('modules') or {}).get('module_tag') or {}).get('text') == '置顶'
+                if dynamic_id and dynamic_id <= last_id:
+                    if pinned:
                         continue
-                    
-                    seen_urls.add(video_url)
-                    
-                    video_data = {
-                        "title": title.strip(),
-                        "url": video_url,
-                        "publish_time": publish_time,
-                        "published_at": published_at.isoformat() if published_at else None,
-                        "play_count": play_count,
-                        "cover_url": cover_url,
-                        "fetched_at": datetime.now().isoformat()
-                    }
-                    
-                    videos.append(video_data)
-                    logger.info(f"获取视频 {len(videos)}: {title[:30]}... (封面: {cover_url[:50] if cover_url else 'N/A'})")
-                    
-                except Exception as e:
-                    logger.warning(f"解析视频 {i+1} 失败: {e}")
-                    continue
+                    report["reached_last_seen"] = True
+                    break
+                report["items"] += 1
+                newest_id = max(newest_id, dynamic_id)
+                video = self.parse_dynamic_item(item)
+                if video:
+                    videos.append(video)
+            
+            offset = data.get('offset')
+            if not data.get('has_more') or not offset:
+                exhausted = True
+            if report["reached_last_seen"] or exhausted:
+                break
+        
+        report["new_videos"] = len(videos)
+        # 未接上上次的位置（请求失败或页数用尽）时游标不前进，避免中间漏掉的动态永远补不回来；
+        # 首次运行没有上次位置，读到的页即为基线
+        complete = report["reached_last_seen"] or exhausted or (not last_id and report["pages"])
+        cursor_id = newest_id if complete else last_id
+        new_state = {
+            "last_dynamic_id": str(cursor_id) if cursor_id else None,
+            "updated_at": datetime.now().isoformat()
+        }
+        logger.info(f"动态流增量: {report['pages']} 页，{report['bytes'] / 1024:.1f} KB，"
+                    f"新动态 {report['items']} 条，其中视频 {len(videos)} 个")
+        return videos, new_state, report
+    
+    def sync_dynamic_feed(self, max_pages=10):
+        """拉取动态流增量并合并进已保存的数据集，保存成功后才推进游标"""
+        videos, new_state, report = self.fetch_dynamic_delta(max_pages=max_pages)
+        if report["pages"] == 0:
+            logger.error("动态流接口请求失败，游标保持不变")
+            return None
+        
+        if videos:
+            data = self.merge_videos(videos)
+            if not self.save_data(data):
+                return None
+            self.save_known_index(data["videos"])
+        
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.save_backfill_state(self.dynamic_cursor_file, new_state)
+        return report
+    
+    def fetch_videos(self):
+        """获取B站视频数据"""
+        self.used_mock_data = False
+        if self.use_api:
+            data = self.fetch_videos_from_api()
+            if data:
+                if self.incremental:
+                    data["videos"] = self.filter_new_videos(data["videos"])
+                    data["total_videos"] = len(data["videos"])
+                return data
+            logger.warning("接口模式失败，回退到Selenium抓取")
+        
+        if not self.setup_driver():
+            logger.error("无法设置Chrome驱动，返回模拟数据")
+            return self.get_mock_data()
+        
+        self.readiness = PageReadiness(self.driver) if PageReadiness else None
+        if self.block_resources:
+            self.resource_blocker = ResourceBlocker(self.driver, 'bilibili')
+            self.resource_blocker.apply()
+        
+        try:
+            logger.info(f"开始访问B站用户页面: {self.base_url}")
+            self.driver.get(self.base_url)
+            
+            # 优先解析页面内嵌的状态JSON，拿到数据就不必等待懒加载的卡片
+            videos = self.extract_videos_from_state(self.driver.page_source)
+            if videos:
+                logger.info(f"从页面内嵌状态解析到 {len(videos)} 个视频，跳过DOM抓取")
+                self.remember_videos(videos)
+            else:
+                videos = self.scrape_video_cards()
             
             if not videos:
                 logger.warning("未获取到任何视频数据，返回模拟数据")
                 return self.get_mock_data()
             
+            # 增量模式下只保留新视频，已知视频不再补全
+            if self.incremental:
+                videos = self.filter_new_videos(videos)
+            
+            # 列表页没有发布时间的视频统一并发补全
+            self.enrich_publish_times(videos)
+            
             return {
                 "user_id": self.user_id,
                 "total_videos": len(videos),
@@ -589,11 +1624,45 @@ class BilibiliSpider:
             logger.error(f"获取B站视频数据失败: {e}")
             return self.get_mock_data()
         finally:
-            if self.driver:
-                self.driver.quit()
+            if self.readiness is not None:
+                logger.info(f"页面就绪等待统计: {self.readiness.summary()}")
+            if self.resource_blocker is not None:
+                logger.info(f"资源屏蔽统计: {self.resource_blocker.summary()}")
+                self.resource_blocker = None
+            if self.meta_cache is not None:
+                logger.info(f"元数据缓存统计: {self.meta_cache.summary()}")
+            self.close_driver()
+    
+    def scrape_video_cards(self):
+        """从渲染后的DOM中抓取视频卡片"""
+        # 等待视频列表加载：按历史命中顺序排列选择器，对整个列表只等待一次
+        selectors = self.get_ordered_selectors()
+        start = time.time()
+        card_selector, video_elements = self.wait_for_cards(selectors["card"])
+        wait_seconds = time.time() - start
+        if video_elements:
+            logger.info(f"使用选择器 '{card_selector}' 找到 {len(video_elements)} 个视频元素")
+        else:
+            logger.warning("所有卡片选择器均未找到视频元素")
+        
+        # 获取前30个视频（去重后可能更少），所有字段在一次 execute_script 中取回
+        start = time.time()
+        cards = self.extract_cards(video_elements[:30], selectors)
+        extract_seconds = time.time() - start
+        logger.info(f"浏览器内提取 {len(cards)} 张卡片，耗时 {extract_seconds:.2f}s")
+        
+        if card_selector:
+            self.record_selector_winners(card_selector, cards, {
+                "card_wait_seconds": round(wait_seconds, 3),
+                "extract_seconds": round(extract_seconds, 3)
+            })
+            logger.info(f"选择器统计: {self.selector_stats}")
+        
+        return self.build_video_records(cards)
     
     def get_mock_data(self):
         """返回模拟数据"""
+        self.used_mock_data = True
         return {
             "user_id": self.user_id,
             "total_videos": 1,
@@ -626,15 +1695,126 @@ class BilibiliSpider:
         """运行爬虫"""
         logger.info("开始B站视频数据爬取...")
         data = self.fetch_videos()
+        
+        if self.incremental:
+            if self.used_mock_data:
+                # 抓取失败时不把模拟数据合并进已有数据集
+                logger.error("增量抓取失败，保留已有数据不变")
+                return False
+            new_count = len(data["videos"])
+            data = self.merge_videos(data["videos"])
+            logger.info(f"增量模式: 新增 {new_count} 个视频，数据集共 {data['total_videos']} 个")
+        
         success = self.save_data(data)
         
         if success:
+            if self.incremental:
+                self.save_known_index(data["videos"])
             logger.info(f"成功获取 {data['total_videos']} 个视频")
         else:
             logger.error("数据保存失败")
         
         return success
 
+def get_cli_option(argv, name, default=None):
+    """读取形如 --name=value 或 --name value 的命令行参数"""
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"{name}="):
+            return arg.split('=', 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return default
+
+def load_user_ids(value):
+    """解析用户ID列表：逗号分隔的字符串，或每行一个ID的文件（# 开头为注释）"""
+    if value and os.path.isfile(value):
+        with open(value, 'r', encoding='utf-8') as f:
+            lines = [line.split('#', 1)[0].strip() for line in f]
+        return [line for line in lines if line]
+    return [user_id.strip() for user_id in (value or '').split(',') if user_id.strip()]
+
+def crawl_users(user_ids, workers=4, rate_per_host=5.0, output_dir=None, merged_output=None, **spider_options):
+    """
+    用有上限的线程池批量抓取多个UP主，所有实例共享按主机的限速器
+    
+    Args:
+        user_ids: 用户ID列表
+        workers: 并发抓取的用户数
+        rate_per_host: 每个主机每秒最多请求数
+        output_dir: 按用户分别输出 bilibili_videos_{user_id}.json 的目录
+        merged_output: 合并输出文件
+        spider_options: 传给 BilibiliSpider 的其他参数
+    """
+    rate_limiter = HostRateLimiter(rate_per_host)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def crawl_one(user_id):
+        spider = BilibiliSpider(user_id=user_id, rate_limiter=rate_limiter, **spider_options)
+        if output_dir:
+            spider.output_file = os.path.join(output_dir, f"bilibili_videos_{user_id}.json")
+        start = time.time()
+        data = spider.fetch_videos()
+        ok = not spider.used_mock_data
+        if ok and output_dir:
+            spider.save_data(data)
+        return {
+            "user_id": user_id,
+            "ok": ok,
+            "videos": len(data["videos"]) if ok else 0,
+            "seconds": round(time.time() - start, 2),
+            "data": data if ok else None
+        }
+    
+    start = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(crawl_one, user_id): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"抓取用户 {user_id} 失败: {e}")
+                result = {"user_id": user_id, "ok": False, "videos": 0, "seconds": None, "data": None}
+            results.append(result)
+            logger.info(f"[{len(results)}/{len(user_ids)}] 用户 {user_id}: "
+                        f"{'成功' if result['ok'] else '失败'}，{result['videos']} 个视频，耗时 {result['seconds']}s")
+    elapsed = time.time() - start
+    
+    # 保持输入顺序
+    order = {user_id: i for i, user_id in enumerate(user_ids)}
+    results.sort(key=lambda result: order[result["user_id"]])
+    
+    if merged_output:
+        merged = {
+            "fetched_at": datetime.now().isoformat(),
+            "total_users": sum(1 for result in results if result["ok"]),
+            "total_videos": sum(result["videos"] for result in results),
+            "users": [result["data"] for result in results if result["ok"]]
+        }
+        with open(merged_output, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        logger.info(f"合并数据已保存到 {merged_output}")
+    
+    latencies = sorted(result["seconds"] for result in results if result["seconds"] is not None)
+    report = {
+        "users": len(user_ids),
+        "succeeded": sum(1 for result in results if result["ok"]),
+        "videos": sum(result["videos"] for result in results),
+        "elapsed_seconds": round(elapsed, 2),
+        "users_per_minute": round(len(user_ids) / elapsed * 60, 1) if elapsed else None,
+        "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+        "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None,
+        "per_user": [
+            {key: result[key] for key in ("user_id", "ok", "videos", "seconds")} for result in results
+        ]
+    }
+    logger.info(f"批量抓取完成: {report['succeeded']}/{report['users']} 个用户，{report['videos']} 个视频，"
+                f"耗时 {report['elapsed_seconds']}s（{report['users_per_minute']} 用户/分钟，"
+                f"P50 {report['latency_p50']}s，P95 {report['latency_p95']}s）")
+    return report
+
 def main():
     """主函数"""
     import sys
@@ -642,12 +1822,87 @@ def main():
     # 检查使用哪个页面
     use_space = '--space' in sys.argv or '-s' in sys.argv
     use_dynamic = '--dynamic' in sys.argv or '-d' in sys.argv
+    use_api = '--api' in sys.argv or '-a' in sys.argv
+    concurrency = int(get_cli_option(sys.argv, '--concurrency', 8))
+    block_resources = '--no-block' not in sys.argv
+    incremental = '--incremental' in sys.argv or '-i' in sys.argv
+    use_cache = '--no-cache' not in sys.argv
+    detail_tabs = int(get_cli_option(sys.argv, '--detail-tabs', 4))
+    
+    spider = BilibiliSpider(use_dynamic=use_dynamic, use_space=use_space, use_api=use_api,
+                            enrich_concurrency=concurrency, block_resources=block_resources,
+                            incremental=incremental, use_cache=use_cache, detail_tabs=detail_tabs)
+    
+    # 用已有的数据文件预热元数据缓存：--warm-cache a.json,b.json
+    warm_files = get_cli_option(sys.argv, '--warm-cache')
+    if warm_files and spider.meta_cache is not None:
+        paths = [path.strip() for path in warm_files.split(',') if path.strip()]
+        count = spider.meta_cache.warm_up(paths, spider.extract_bvid)
+        print(f"✅ 元数据缓存预热完成，写入 {count} 条，当前共 {spider.meta_cache.summary()['entries']} 条")
+        return
+    
+    # 批量抓取多个UP主：--users 1,2,3 或 --users users.txt
+    users = get_cli_option(sys.argv, '--users')
+    if users:
+        user_ids = load_user_ids(users)
+        report = crawl_users(
+            user_ids,
+            workers=int(get_cli_option(sys.argv, '--workers', 4)),
+            rate_per_host=float(get_cli_option(sys.argv, '--rate', 5)),
+            output_dir=get_cli_option(sys.argv, '--output-dir'),
+            merged_output=get_cli_option(sys.argv, '--merged', 'bilibili_videos_merged.json'),
+            use_dynamic=use_dynamic, use_space=use_space, use_api=use_api,
+            enrich_concurrency=concurrency, block_resources=block_resources, use_cache=use_cache,
+            detail_tabs=detail_tabs
+        )
+        print(f"✅ 批量抓取完成: {report['succeeded']}/{report['users']} 个用户，共 {report['videos']} 个视频")
+        return
     
-    spider = BilibiliSpider(use_dynamic=use_dynamic, use_space=use_space)
+    # 只刷新已保存数据集的播放/点赞/投币数：--refresh-stats [数据文件]
+    if '--refresh-stats' in sys.argv:
+        data_file = get_cli_option(sys.argv, '--refresh-stats')
+        if data_file and data_file.startswith('-'):
+            data_file = None
+        report = spider.refresh_stats(data_file)
+        if report is None:
+            print("❌ 统计刷新失败：未找到数据集")
+        else:
+            print(f"✅ 统计刷新完成: {report['refreshed']}/{report['videos']} 个视频，"
+                  f"{report['changed_videos']} 个有变化")
+        return
+    
+    # 动态流增量同步：只拉取上次同步之后的新动态（纯接口，不启动浏览器）
+    if '--dynamic-feed' in sys.argv:
+        try:
+            report = spider.sync_dynamic_feed(max_pages=int(get_cli_option(sys.argv, '--max-pages', 10)))
+        except Exception as e:
+            logger.error(f"动态流同步出错: {e}")
+            report = None
+        if report is None:
+            print("❌ 动态流同步失败")
+        else:
+            print(f"✅ 动态流同步完成: 新视频 {report['new_videos']} 个，"
+                  f"请求 {report['pages']} 页 / {report['bytes'] / 1024:.1f} KB")
+        return
+    
+    # 全量回填：分页写入JSONL，中断后重新运行即可从断点继续
+    if '--backfill' in sys.argv:
+        try:
+            state = spider.backfill(
+                sink_file=get_cli_option(sys.argv, '--sink'),
+                page_size=int(get_cli_option(sys.argv, '--page-size', 30)),
+                flush_every=int(get_cli_option(sys.argv, '--flush-every', 5))
+            )
+            print(f"✅ B站投稿回填完成，共 {state.get('written', 0)} 条")
+        except Exception as e:
+            print(f"❌ B站投稿回填中断: {e}（重新运行将从断点继续）")
+        return
     success = spider.run()
     
     if success:
-        if use_space:
+        if use_api:
+            source = "投稿列表接口"
+        elif use_space:
             source = "用户空间主页"
         elif use_dynamic:
             source = "动态页面"
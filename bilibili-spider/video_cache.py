@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+B站视频元数据缓存
+以BV号为键的SQLite缓存：发布时间永久保存，播放量等易变统计带TTL，按最近访问时间做LRU淘汰
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class VideoMetaCache:
+    def __init__(self, path, stats_ttl=3600, max_entries=50000):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 文件路径
+            stats_ttl: 播放量等统计数据的有效期（秒）
+            max_entries: 最多保留的视频条数，超出后淘汰最久未访问的
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.stats_ttl = stats_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS videos (
+                bvid TEXT PRIMARY KEY,
+                pubdate INTEGER,
+                title TEXT,
+                stats TEXT,
+                stats_updated_at REAL,
+                last_access REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_last_access ON videos (last_access)")
+        self.conn.commit()
+        self.counters = {'hits': 0, 'misses': 0, 'stats_hits': 0, 'stats_misses': 0, 'writes': 0, 'evicted': 0}
+
+    def get_pubdates(self, bvids):
+        """批量查询发布时间，返回 {bvid: 时间戳}（只含命中的）"""
+        bvids = list(dict.fromkeys(bvids))
+        if not bvids:
+            return {}
+        found = {}
+        with self.lock:
+            for start in range(0, len(bvids), 500):
+                chunk = bvids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT bvid, pubdate FROM videos WHERE pubdate IS NOT NULL AND bvid IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                found.update(rows)
+            self.touch(found.keys())
+            self.counters['hits'] += len(found)
+            self.counters['misses'] += len(bvids) - len(found)
+        return found
+
+    def get_pubdate(self, bvid):
+        """查询单个视频的发布时间戳，未命中返回None"""
+        return self.get_pubdates([bvid]).get(bvid)
+
+    def get_stats(self, bvid):
+        """查询未过期的统计数据，过期或不存在返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT stats, stats_updated_at FROM videos WHERE bvid = ?", (bvid,)
+            ).fetchone()
+            if row and row[0] and row[1] and time.time() - row[1] < self.stats_ttl:
+                self.touch([bvid])
+                self.counters['stats_hits'] += 1
+                return json.loads(row[0])
+            self.counters['stats_misses'] += 1
+            return None
+
+    def touch(self, bvids):
+        """更新最近访问时间（调用方需持有锁）"""
+        now = time.time()
+        self.conn.executemany("UPDATE videos SET last_access = ? WHERE bvid = ?", [(now, bvid) for bvid in bvids])
+        self.conn.commit()
+
+    def put_many(self, records):
+        """
+        批量写入，records 为 (bvid, pubdate, title, stats) 元组；
+        值为None的字段保留原值（发布时间一旦写入就不会被覆盖为空）
+        """
+        now = time.time()
+        rows = []
+        for bvid, pubdate, title, stats in records:
+            if not bvid:
+                continue
+            rows.append((
+                bvid, pubdate, title,
+                json.dumps(stats, ensure_ascii=False) if stats else None,
+                now if stats else None,
+                now
+            ))
+        if not rows:
+            return
+        with self.lock:
+            self.conn.executemany("""
+                INSERT INTO videos (bvid, pubdate, title, stats, stats_updated_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(bvid) DO UPDATE SET
+                    pubdate = COALESCE(videos.pubdate, excluded.pubdate),
+                    title = COALESCE(excluded.title, videos.title),
+                    stats = COALESCE(excluded.stats, videos.stats),
+                    stats_updated_at = COALESCE(excluded.stats_updated_at, videos.stats_updated_at),
+                    last_access = excluded.last_access
+            """, rows)
+            self.counters['writes'] += len(rows)
+            self.evict()
+            self.conn.commit()
+
+    def put(self, bvid, pubdate=None, title=None, stats=None):
+        self.put_many([(bvid, pubdate, title, stats)])
+
+    def evict(self):
+        """超过容量时淘汰最久未访问的条目（调用方需持有锁）"""
+        count = self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM videos WHERE bvid IN (SELECT bvid FROM videos ORDER BY last_access ASC LIMIT ?)",
+                (excess,)
+            )
+            self.counters['evicted'] += excess
+
+    def warm_up(self, paths, extract_bvid):
+        """从已有的 bilibili_videos.json 文件批量预热，返回写入条数"""
+        records = []
+        for path in paths:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取 {path} 失败: {e}")
+                continue
+            # 兼容批量抓取的合并文件（users 列表）
+            datasets = data.get('users') or [data]
+            for dataset in datasets:
+                for video in dataset.get('videos') or []:
+                    bvid = extract_bvid(video.get('url'))
+                    published_at = video.get('published_at')
+                    if not bvid or not published_at:
+                        continue
+                    try:
+                        pubdate = int(datetime.fromisoformat(published_at).timestamp())
+                    except ValueError:
+                        continue
+                    records.append((bvid, pubdate, video.get('title'), None))
+        self.put_many(records)
+        return len(records)
+
+    def summary(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        lookups = self.counters['hits'] + self.counters['misses']
+        return dict(
+            self.counters,
+            entries=entries,
+            hit_rate=round(self.counters['hits'] / lookups, 3) if lookups else None
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻无头浏览器服务
+启动一个长期运行的 Chrome（远程调试模式），供各个 Selenium 爬虫通过租约附加使用，
+按使用次数或内存上限自动回收重启，并通过 HTTP 暴露健康状态和利用率计数
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+
+DEFAULT_SERVICE_URL = os.environ.get('BROWSER_SERVICE_URL', 'http://127.0.0.1:9230')
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 两个爬虫原先各自配置的启动参数的并集
+CHROME_ARGUMENTS = [
+    '--headless=new',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--window-size=1920,1080',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--no-first-run',
+    '--no-default-browser-check',
+    f'--user-agent={USER_AGENT}'
+]
+
+CHROME_CANDIDATES = [
+    'google-chrome',
+    'google-chrome-stable',
+    'chromium',
+    'chromium-browser',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+]
+
+
+def find_chrome_binary():
+    """查找本机的 Chrome 可执行文件（可通过 CHROME_BINARY 环境变量指定）"""
+    configured = os.environ.get('CHROME_BINARY')
+    if configured:
+        return configured
+    for candidate in CHROME_CANDIDATES:
+        path = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+        if path:
+            return path
+    return None
+
+
+def process_tree_rss_mb(root_pid):
+    """统计进程树（浏览器主进程及其所有子进程）的常驻内存，单位MB"""
+    try:
+        output = subprocess.run(
+            ['ps', '-axo', 'pid=,ppid=,rss='], capture_output=True, text=True, timeout=5
+        ).stdout
+    except Exception:
+        return None
+
+    children = {}
+    rss = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) != 3:
+            continue
+        pid, ppid, kb = (int(part) for part in parts)
+        children.setdefault(ppid, []).append(pid)
+        rss[pid] = kb
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_kb += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return round(total_kb / 1024, 1)
+
+
+class BrowserService:
+    def __init__(self, debug_port=9222, max_uses=50, max_rss_mb=1500, max_leases=4, lease_ttl=600):
+        """
+        初始化浏览器服务
+
+        Args:
+            debug_port: Chrome 远程调试端口
+            max_uses: 浏览器累计出租多少次后回收重启
+            max_rss_mb: 浏览器进程树内存超过该值后回收重启
+            max_leases: 同时允许的租约数量（每个租约对应一个独立标签页）
+            lease_ttl: 租约超时时间（秒），从最近一次续约算起；客户端停止心跳（异常退出）时自动回收
+        """
+        self.debug_port = debug_port
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.max_leases = max_leases
+        self.lease_ttl = lease_ttl
+
+        self.process = None
+        self.profile_dir = None
+        self.leases = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.browser_started_at = None
+        self.uses_since_launch = 0
+        self.recycle_pending = False
+        self.stats = {
+            'launches': 0,
+            'recycles': 0,
+            'leases_total': 0,
+            'leases_rejected': 0,
+            'leases_expired': 0,
+            'leases_renewed': 0,
+            'last_launch_seconds': None
+        }
+
+    @property
+    def debugger_address(self):
+        return f'127.0.0.1:{self.debug_port}'
+
+    def is_browser_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def launch_browser(self):
+        """启动浏览器并等待远程调试端口就绪"""
+        chrome = find_chrome_binary()
+        if not chrome:
+            raise RuntimeError("未找到Chrome浏览器，请设置 CHROME_BINARY 环境变量")
+
+        start = time.time()
+        self.profile_dir = tempfile.mkdtemp(prefix='browser-service-')
+        command = [chrome] + CHROME_ARGUMENTS + [
+            f'--remote-debugging-port={self.debug_port}',
+            f'--user-data-dir={self.profile_dir}',
+            'about:blank'
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                with socket.create_connection(('127.0.0.1', self.debug_port), timeout=0.5):
+                    break
+            except OSError:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Chrome启动失败，退出码 {self.process.returncode}")
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("等待Chrome远程调试端口超时")
+
+        self.browser_started_at = time.time()
+        self.uses_since_launch = 0
+        self.recycle_pending = False
+        self.stats['launches'] += 1
+        self.stats['last_launch_seconds'] = round(time.time() - start, 2)
+        print(f"Chrome已启动 (pid={self.process.pid}, 耗时 {self.stats['last_launch_seconds']}s)")
+
+    def stop_browser(self):
+        """关闭浏览器并清理临时用户目录"""
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def recycle_browser(self, reason):
+        """回收并重启浏览器（调用方需持有锁）"""
+        print(f"回收浏览器: {reason}")
+        self.stop_browser()
+        self.stats['recycles'] += 1
+        self.launch_browser()
+
+    def needs_recycle(self):
+        """判断是否达到回收条件（使用次数或内存上限）"""
+        if self.uses_since_launch >= self.max_uses:
+            return f"已使用 {self.uses_since_launch} 次"
+        rss_mb = process_tree_rss_mb(self.process.pid) if self.is_browser_alive() else None
+        if rss_mb is not None and rss_mb > self.max_rss_mb:
+            return f"内存 {rss_mb}MB 超过上限 {self.max_rss_mb}MB"
+        return None
+
+    def close_tab(self, target_id):
+        """通过 DevTools HTTP 接口关闭租约的标签页"""
+        try:
+            with urlrequest.urlopen(f'http://{self.debugger_address}/json/close/{target_id}', timeout=2):
+                pass
+        except Exception as e:
+            print(f"关闭标签页 {target_id} 失败: {e}")
+
+    def expire_leases(self):
+        """回收超过 lease_ttl 未续约的租约，并关闭其标签页（调用方需持有锁）"""
+        now = time.time()
+        for lease_id, lease in list(self.leases.items()):
+            if now - lease['renewed_at'] > self.lease_ttl:
+                del self.leases[lease_id]
+                self.stats['leases_expired'] += 1
+                print(f"租约超时未续约，已回收: {lease_id} ({lease.get('client')})")
+                if lease.get('target_id') and self.is_browser_alive():
+                    self.close_tab(lease['target_id'])
+
+    def acquire(self, client=None):
+        """出租浏览器，返回租约；达到并发上限或需要回收时返回None"""
+        with self.lock:
+            self.expire_leases()
+            if not self.is_browser_alive():
+                self.launch_browser()
+            elif not self.leases:
+                reason = self.needs_recycle()
+                if reason or self.recycle_pending:
+                    self.recycle_browser(reason or "待回收")
+
+            # 等待回收期间不再出租，避免新租约阻塞回收
+            if len(self.leases) >= self.max_leases or self.recycle_pending:
+                self.stats['leases_rejected'] += 1
+                return None
+
+            now = time.time()
+            lease = {
+                'lease_id': uuid.uuid4().hex,
+                'debugger_address': self.debugger_address,
+                'client': client,
+                'acquired_at': now,
+                'renewed_at': now,
+                'lease_ttl': self.lease_ttl,
+                # 标签页的 CDP target id，由客户端首次续约时上报
+                'target_id': None
+            }
+            self.leases[lease['lease_id']] = lease
+            self.uses_since_launch += 1
+            self.stats['leases_total'] += 1
+            return lease
+
+    def renew(self, lease_id, target_id=None):
+        """续约（客户端心跳），同时记录租约的标签页；租约已过期或不存在时返回False"""
+        with self.lock:
+            self.expire_leases()
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return False
+            lease['renewed_at'] = time.time()
+            if target_id:
+                lease['target_id'] = target_id
+            self.stats['leases_renewed'] += 1
+            return True
+
+    def release(self, lease_id):
+        """归还租约；空闲且达到回收条件时立即回收"""
+        with self.lock:
+            if self.leases.pop(lease_id, None) is None:
+                return False
+            reason = self.needs_recycle()
+            if reason:
+                if self.leases:
+                    self.recycle_pending = True
+                else:
+                    self.recycle_browser(reason)
+            return True
+
+    def health(self):
+        """健康状态和利用率计数"""
+        with self.lock:
+            self.expire_leases()
+            alive = self.is_browser_alive()
+            return {
+                'status': 'ok' if alive else 'down',
+                'pid': self.process.pid if alive else None,
+                'debugger_address': self.debugger_address,
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'browser_age_seconds': round(time.time() - self.browser_started_at, 1) if alive else None,
+                'rss_mb': process_tree_rss_mb(self.process.pid) if alive else None,
+                'max_rss_mb': self.max_rss_mb,
+                'uses_since_launch': self.uses_since_launch,
+                'max_uses': self.max_uses,
+                'active_leases': len(self.leases),
+                'max_leases': self.max_leases,
+                'utilisation': round(len(self.leases) / self.max_leases, 2),
+                'recycle_pending': self.recycle_pending,
+                **self.stats
+            }
+
+    def monitor(self, interval=30):
+        """后台巡检：浏览器意外退出时重启，空闲时检查回收条件"""
+        while True:
+            time.sleep(interval)
+            try:
+                with self.lock:
+                    self.expire_leases()
+                    if not self.is_browser_alive():
+                        print("检测到浏览器已退出，重新启动")
+                        self.launch_browser()
+                    elif not self.leases:
+                        reason = self.needs_recycle()
+                        if reason or self.recycle_pending:
+                            self.recycle_browser(reason or "待回收")
+            except Exception as e:
+                print(f"巡检失败: {e}")
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length))
+            except ValueError:
+                return {}
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(200, service.health())
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            payload = self.read_json()
+            try:
+                if self.path == '/acquire':
+                    lease = service.acquire(payload.get('client'))
+                    if lease:
+                        self.send_json(200, lease)
+                    else:
+                        self.send_json(503, {'error': '浏览器繁忙或正在回收'})
+                elif self.path == '/renew':
+                    renewed = service.renew(payload.get('lease_id'), payload.get('target_id'))
+                    self.send_json(200 if renewed else 404, {'renewed': renewed})
+                elif self.path == '/release':
+                    released = service.release(payload.get('lease_id'))
+                    self.send_json(200 if released else 404, {'released': released})
+                else:
+                    self.send_json(404, {'error': 'not found'})
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class BrowserServiceClient:
+    """爬虫端使用的客户端：租用常驻浏览器中的独立标签页，附加期间后台定时续约"""
+
+    def __init__(self, base_url=DEFAULT_SERVICE_URL, client_name=None, timeout=3):
+        self.base_url = base_url.rstrip('/')
+        self.client_name = client_name
+        self.timeout = timeout
+        self.lease = None
+        self.target_id = None
+        self.heartbeat_stop = None
+
+    def call(self, method, path, payload=None):
+        data = json.dumps(payload or {}).encode('utf-8') if method == 'POST' else None
+        req = urlrequest.Request(
+            f'{self.base_url}{path}', data=data, method=method,
+            headers={'Content-Type': 'application/json'}
+        )
+        with urlrequest.urlopen(req, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def health(self):
+        """查询服务健康状态，服务不可用时返回None"""
+        try:
+            return self.call('GET', '/health')
+        except Exception:
+            return None
+
+    def attach_driver(self, service=None, capabilities=None):
+        """
+        租用浏览器并返回附加到其上的 WebDriver（在新标签页中工作）
+        服务不可用或繁忙时返回None，调用方应回退到本地启动浏览器
+
+        Args:
+            service: selenium 的 chrome Service（用于指定 chromedriver 路径），可选
+            capabilities: 额外的会话能力（如 goog:loggingPrefs），可选
+        """
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+
+        try:
+            self.lease = self.call('POST', '/acquire', {'client': self.client_name})
+        except Exception:
+            self.lease = None
+            return None
+
+        driver = None
+        try:
+            options = Options()
+            options.debugger_address = self.lease['debugger_address']
+            # DOMContentLoaded 后即返回，数据是否就绪由 page_ready 判断
+            options.page_load_strategy = 'eager'
+            for name, value in (capabilities or {}).items():
+                options.set_capability(name, value)
+            if service is not None:
+                driver = webdriver.Chrome(service=service, options=options)
+            else:
+                driver = webdriver.Chrome(options=options)
+            # 每个租约使用独立的标签页，互不干扰
+            driver.switch_to.new_window('tab')
+            # chromedriver 的窗口句柄即 CDP target id，服务在租约超时时据此关闭标签页
+            self.target_id = driver.current_window_handle
+            self.start_heartbeat()
+            return driver
+        except Exception:
+            # 会话已建立时先结束它，避免遗留 chromedriver 进程（附加模式下 quit 不会关闭共享浏览器）
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+            self.release()
+            raise
+
+    def start_heartbeat(self):
+        """立即续约一次（上报标签页），之后每 lease_ttl/3 秒续约，直到归还租约"""
+        lease = self.lease
+        stop = threading.Event()
+        self.heartbeat_stop = stop
+        interval = max(1, lease.get('lease_ttl', 600) / 3)
+
+        def beat():
+            while True:
+                try:
+                    renewed = self.call('POST', '/renew', {'lease_id': lease['lease_id'], 'target_id': self.target_id})
+                    if not renewed.get('renewed'):
+                        break
+                except Exception as e:
+                    # 404 表示租约已被回收，其他错误下次重试
+                    if getattr(e, 'code', None) == 404:
+                        print(f"浏览器服务租约已失效: {lease['lease_id']}")
+                        break
+                if stop.wait(interval):
+                    break
+
+        threading.Thread(target=beat, daemon=True).start()
+
+    def detach_driver(self, driver):
+        """关闭本租约的标签页并归还租约（不会关闭共享浏览器）"""
+        try:
+            if driver is not None:
+                driver.close()
+                driver.quit()
+        except Exception:
+            pass
+        finally:
+            self.release()
+
+    def release(self):
+        if self.heartbeat_stop is not None:
+            self.heartbeat_stop.set()
+            self.heartbeat_stop = None
+        if not self.lease:
+            return
+        try:
+            self.call('POST', '/release', {'lease_id': self.lease['lease_id']})
+        except Exception:
+            pass
+        self.lease = None
+
+
+def get_cli_option(argv, name, default=None):
+    """读取形如 --name=value 或 --name value 的命令行参数"""
+    for i, arg in enumerate(argv):
+        if arg.startswith(f"{name}="):
+            return arg.split('=', 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return default
+
+
+def main():
+    """主函数"""
+    port = int(get_cli_option(sys.argv, '--port', 9230))
+    service = BrowserService(
+        debug_port=int(get_cli_option(sys.argv, '--debug-port', 9222)),
+        max_uses=int(get_cli_option(sys.argv, '--max-uses', 50)),
+        max_rss_mb=int(get_cli_option(sys.argv, '--max-rss-mb', 1500)),
+        max_leases=int(get_cli_option(sys.argv, '--max-leases', 4)),
+        lease_ttl=int(get_cli_option(sys.argv, '--lease-ttl', 600))
+    )
+    service.launch_browser()
+    threading.Thread(target=service.monitor, daemon=True).start()
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(service))
+    print(f"浏览器服务已启动: http://127.0.0.1:{port} (健康检查: /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop_browser()
+
+
+if __name__ == "__main__":
+    main()
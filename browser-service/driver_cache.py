@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ChromeDriver 解析缓存
+记录已匹配的 chromedriver 路径和 Chrome 版本，本机 Chrome 未变化时直接复用，不做任何网络请求
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from browser_service import find_chrome_binary
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'chromedriver.json')
+
+
+def chrome_fingerprint(chrome_path):
+    """本机 Chrome 可执行文件的指纹（路径+大小+修改时间），升级后会变化"""
+    if not chrome_path:
+        return None
+    try:
+        real_path = os.path.realpath(chrome_path)
+        stat = os.stat(real_path)
+        return f"{real_path}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return None
+
+
+def get_chrome_version(chrome_path):
+    """读取本机 Chrome 版本（本地执行，不联网）"""
+    if not chrome_path:
+        return None
+    try:
+        output = subprocess.run([chrome_path, '--version'], capture_output=True, text=True, timeout=10).stdout
+        return output.strip().split()[-1] if output.strip() else None
+    except Exception:
+        return None
+
+
+def is_executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def load_cache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_file, data):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        print(f"写入ChromeDriver缓存失败: {e}")
+
+
+def install_chromedriver():
+    """通过 webdriver-manager 解析（可能联网），失败时使用系统 PATH 中的 chromedriver"""
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        return ChromeDriverManager().install(), 'webdriver-manager'
+    except Exception as e:
+        print(f"自动下载ChromeDriver失败: {e}")
+    system_driver = shutil.which('chromedriver')
+    if system_driver:
+        return system_driver, 'system'
+    return None, None
+
+
+def resolve_chromedriver(cache_file=DEFAULT_CACHE_FILE):
+    """
+    解析 chromedriver 路径
+
+    Returns:
+        (driver_path, info)，driver_path 可能为 None（交给 Selenium 自行查找）；
+        info 包含 cache_hit、chrome_version、source、resolve_seconds
+    """
+    start = time.time()
+    chrome_path = find_chrome_binary()
+    fingerprint = chrome_fingerprint(chrome_path)
+    cached = load_cache(cache_file)
+
+    if cached.get('fingerprint') == fingerprint and is_executable(cached.get('driver_path')):
+        info = {
+            'cache_hit': True,
+            'chrome_version': cached.get('chrome_version'),
+            'source': cached.get('source'),
+            'resolve_seconds': round(time.time() - start, 3)
+        }
+        return cached['driver_path'], info
+
+    # Chrome 变化（或首次运行）时才重新解析
+    chrome_version = get_chrome_version(chrome_path)
+    driver_path, source = install_chromedriver()
+    if driver_path:
+        save_cache(cache_file, {
+            'fingerprint': fingerprint,
+            'chrome_path': chrome_path,
+            'chrome_version': chrome_version,
+            'driver_path': driver_path,
+            'source': source,
+            'resolved_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        })
+
+    info = {
+        'cache_hit': False,
+        'chrome_version': chrome_version,
+        'source': source,
+        'resolve_seconds': round(time.time() - start, 3)
+    }
+    return driver_path, info
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面就绪检测
+用 DOM 变更监听（MutationObserver）和网络空闲检测代替固定的 time.sleep，
+所需数据一出现就返回，并统计相对原固定等待节省的时间
+"""
+
+import time
+
+# 条件满足（返回真值）时立即结束；DOM变化时重新检查，另有定时轮询兜底（如JS变量赋值不触发DOM变化）
+# 参数: arguments[0] 条件函数体（接收 args）, arguments[1] args, arguments[2] 超时毫秒
+WAIT_FOR_CONDITION_SCRIPT = """
+var condition = new Function('args', arguments[0]);
+var args = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+function check() {
+    try { return condition(args) || null; } catch (e) { return null; }
+}
+var initial = check();
+if (initial) { done(initial); return; }
+var finished = false, observer = null, poll = null, timer = null;
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    if (observer) observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    done(result);
+}
+observer = new MutationObserver(function () {
+    var result = check();
+    if (result) finish(result);
+});
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+poll = setInterval(function () {
+    var result = check();
+    if (result) finish(result);
+}, 200);
+timer = setTimeout(function () { finish(null); }, timeoutMs);
+"""
+
+# 资源请求数在 idleMs 内不再增长且文档已解析完成，视为网络空闲
+# 参数: arguments[0] 空闲判定毫秒, arguments[1] 超时毫秒
+WAIT_FOR_NETWORK_IDLE_SCRIPT = """
+var idleMs = arguments[0], timeoutMs = arguments[1];
+var done = arguments[arguments.length - 1];
+var start = Date.now(), lastCount = -1, lastChange = Date.now();
+var poll = setInterval(function () {
+    var count = performance.getEntriesByType('resource').length;
+    if (count !== lastCount) {
+        lastCount = count;
+        lastChange = Date.now();
+    }
+    var idle = document.readyState !== 'loading' && Date.now() - lastChange >= idleMs;
+    if (idle || Date.now() - start >= timeoutMs) {
+        clearInterval(poll);
+        done(idle);
+    }
+}, 100);
+"""
+
+
+def selector_condition(selectors):
+    """生成“任一选择器能匹配到元素”的条件函数体，返回命中的选择器"""
+    return """
+        var list = args;
+        for (var i = 0; i < list.length; i++) {
+            try { if (document.querySelector(list[i])) return list[i]; } catch (e) {}
+        }
+        return null;
+    """, list(selectors)
+
+
+class PageReadiness:
+    def __init__(self, driver, timeout=10):
+        """
+        初始化就绪检测器
+
+        Args:
+            driver: Selenium WebDriver
+            timeout: 默认最长等待时间（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.stats = {
+            'waits': 0,
+            'timeouts': 0,
+            'script_errors': 0,
+            'waited_seconds': 0.0,
+            'fixed_sleep_seconds': 0.0
+        }
+        # 最近一次等待脚本的异常（如页面 CSP 禁止 new Function、脚本超时）；正常结束或超时未就绪时为None
+        self.last_error = None
+
+    def record(self, elapsed, budget, ready):
+        self.stats['waits'] += 1
+        self.stats['waited_seconds'] += elapsed
+        if self.last_error is not None:
+            # 脚本执行失败时调用方会退回原来的等待方式，不计入节省（也不算作超时）
+            return
+        self.stats['fixed_sleep_seconds'] += budget or 0
+        if not ready:
+            self.stats['timeouts'] += 1
+
+    def run_async(self, script, *args, timeout):
+        """
+        执行异步等待脚本；脚本出错或被中断（页面跳转、CSP、脚本超时）时返回None，
+        异常记录在 last_error 中，调用方可据此回退到其他等待方式
+        """
+        self.last_error = None
+        self.driver.set_script_timeout(timeout + 2)
+        try:
+            return self.driver.execute_async_script(script, *args)
+        except Exception as e:
+            self.last_error = e
+            self.stats['script_errors'] += 1
+            return None
+
+    def wait_for(self, condition_body, args=None, timeout=None, budget=0):
+        """
+        等待条件满足，返回条件的结果（超时返回None）
+
+        Args:
+            condition_body: JS 条件函数体，可使用 args，返回真值表示就绪
+            args: 传给条件函数的参数
+            timeout: 最长等待时间（秒）
+            budget: 被替换掉的原固定等待时长（秒），用于统计节省的时间
+        """
+        timeout = timeout or self.timeout
+        start = time.time()
+        result = self.run_async(WAIT_FOR_CONDITION_SCRIPT, condition_body, args, int(timeout * 1000),
+                                timeout=timeout)
+        self.record(time.time() - start, budget, bool(result))
+        return result
+
+    def wait_for_selector(self, selectors, timeout=None, budget=0):
+        """等待任一选择器出现，返回命中的选择器"""
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        body, args = selector_condition(selectors)
+        return self.wait_for(body, args, timeout=timeout, budget=budget)
+
+    def wait_for_network_idle(self, idle_ms=500, timeout=None, budget=0):
+        """等待网络空闲（资源请求在 idle_ms 内不再增加）"""
+        timeout = timeout or self.timeout
+        start = time.time()
+        idle = self.run_async(WAIT_FOR_NETWORK_IDLE_SCRIPT, idle_ms, int(timeout * 1000), timeout=timeout)
+        self.record(time.time() - start, budget, bool(idle))
+        return bool(idle)
+
+    def summary(self):
+        """本次运行的等待统计"""
+        waited = round(self.stats['waited_seconds'], 2)
+        fixed = round(self.stats['fixed_sleep_seconds'], 2)
+        return {
+            'waits': self.stats['waits'],
+            'timeouts': self.stats['timeouts'],
+            'script_errors': self.stats['script_errors'],
+            'waited_seconds': waited,
+            'fixed_sleep_seconds': fixed,
+            'saved_seconds': round(fixed - waited, 2)
+        }
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无头浏览器资源屏蔽
+爬虫只读取文本和属性值（封面只要 src/data-src），通过 CDP Network.setBlockedURLs
+屏蔽图片、字体、音视频和统计脚本的下载，并统计屏蔽掉的请求数和估算节省的流量
+"""
+
+import json
+
+# 按资源类别划分的屏蔽模式
+BLOCK_PATTERNS = {
+    'image': ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+              '*.jpg@*', '*.png@*', '*.webp@*', '*.avif@*'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.m4s', '*.flv', '*.webm', '*.mp3', '*.m3u8'],
+    'tracking': ['*google-analytics.com*', '*googletagmanager.com*', '*hm.baidu.com*',
+                 '*doubleclick.net*', '*cnzz.com*']
+}
+
+# 各站点的屏蔽配置：block_types 为屏蔽的类别，deny 为额外屏蔽的模式，
+# unblock 中的模式会从最终屏蔽列表中原样移除（必须与某个屏蔽模式完全相同）。
+# setBlockedURLs 不支持例外规则，unblock 不能放行某个具体URL：
+# 例如 '*i0.hdslb.com/bfs/face/*' 对头像不起作用，因为 '*.jpg' 仍会屏蔽它；需要放行时应从 block_types 中去掉对应类别
+SITE_PROFILES = {
+    'bilibili': {
+        'block_types': ['image', 'font', 'media', 'tracking'],
+        'deny': ['*data.bilibili.com*', '*cm.bilibili.com*', '*api.bilibili.com/x/web-show/*',
+                 '*s1.hdslb.com/bfs/seed/log/*', '*upos-*.bilivideo.com*'],
+        'unblock': []
+    },
+    'jianshu': {
+        'block_types': ['image', 'font', 'media', 'tracking'],
+        'deny': ['*upload-images.jianshu.io*', '*cdn2.jianshu.io/shakespeare/*'],
+        'unblock': []
+    }
+}
+
+# 被屏蔽请求的平均大小（字节），仅用于估算节省的流量
+ESTIMATED_BYTES = {
+    'Image': 60 * 1024,
+    'Font': 40 * 1024,
+    'Media': 500 * 1024,
+    'Script': 30 * 1024,
+    'Stylesheet': 20 * 1024,
+    'Other': 10 * 1024
+}
+
+# 创建 driver 时需要开启 performance 日志，才能统计被屏蔽的请求
+LOGGING_PREFS_CAPABILITY = ('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def build_blocked_patterns(site, block_types=None, deny=None, unblock=None):
+    """根据站点配置生成屏蔽模式列表；unblock 只移除完全相同的模式，不是URL白名单"""
+    profile = SITE_PROFILES.get(site, {})
+    types = block_types if block_types is not None else profile.get('block_types', list(BLOCK_PATTERNS))
+    patterns = []
+    for block_type in types:
+        patterns.extend(BLOCK_PATTERNS.get(block_type, []))
+    patterns.extend(profile.get('deny', []))
+    patterns.extend(deny or [])
+
+    removed = set(profile.get('unblock', [])) | set(unblock or [])
+    unknown = removed - set(patterns)
+    if unknown:
+        print(f"unblock 中的模式不在屏蔽列表中，已忽略（unblock 不能放行具体URL）: {sorted(unknown)}")
+    return [pattern for pattern in dict.fromkeys(patterns) if pattern not in removed]
+
+
+def enable_performance_logging(options):
+    """在 ChromeOptions 上开启 performance 日志（用于统计屏蔽效果）"""
+    options.set_capability(*LOGGING_PREFS_CAPABILITY)
+    return options
+
+
+class ResourceBlocker:
+    def __init__(self, driver, site, block_types=None, deny=None, unblock=None):
+        """
+        初始化资源屏蔽器
+
+        Args:
+            driver: Selenium Chrome WebDriver
+            site: 站点名，对应 SITE_PROFILES 中的配置
+            block_types: 覆盖站点默认屏蔽的资源类别
+            deny: 额外屏蔽的 URL 模式
+            unblock: 从屏蔽列表中移除的模式（须与屏蔽模式完全相同，不能放行具体URL）
+        """
+        self.driver = driver
+        self.site = site
+        self.patterns = build_blocked_patterns(site, block_types, deny, unblock)
+        self.enabled = False
+        self.request_types = {}
+        self.stats = {
+            'blocked_requests': 0,
+            'estimated_bytes_avoided': 0,
+            'loaded_requests': 0,
+            'loaded_bytes': 0,
+            'blocked_by_type': {}
+        }
+
+    def apply(self):
+        """在当前标签页上启用屏蔽，失败时返回False（不影响抓取）"""
+        try:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.patterns})
+            self.enabled = True
+        except Exception as e:
+            print(f"启用资源屏蔽失败: {e}")
+            self.enabled = False
+        return self.enabled
+
+    def collect(self):
+        """读取 performance 日志并累计屏蔽/加载计数（日志读取后即清空，可多次调用）"""
+        if not self.enabled:
+            return self.stats
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
+            return self.stats
+
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method == 'Network.requestWillBeSent':
+                self.request_types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                resource_type = params.get('type') or self.request_types.get(params.get('requestId'), 'Other')
+                self.stats['blocked_requests'] += 1
+                self.stats['estimated_bytes_avoided'] += ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES['Other'])
+                by_type = self.stats['blocked_by_type']
+                by_type[resource_type] = by_type.get(resource_type, 0) + 1
+            elif method == 'Network.loadingFinished':
+                self.stats['loaded_requests'] += 1
+                self.stats['loaded_bytes'] += int(params.get('encodedDataLength') or 0)
+        return self.stats
+
+    def summary(self):
+        """屏蔽效果汇总"""
+        stats = self.collect()
+        return {
+            'site': self.site,
+            'patterns': len(self.patterns),
+            'blocked_requests': stats['blocked_requests'],
+            'estimated_kb_avoided': round(stats['estimated_bytes_avoided'] / 1024, 1),
+            'loaded_requests': stats['loaded_requests'],
+            'loaded_kb': round(stats['loaded_bytes'] / 1024, 1),
+            'blocked_by_type': stats['blocked_by_type']
+        }
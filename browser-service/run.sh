@@ -0,0 +1,17 @@
+#!/bin/bash
+
+# 常驻无头浏览器服务启动脚本
+
+echo "🚀 启动常驻浏览器服务..."
+
+# 检查Python环境
+if ! command -v python3 &> /dev/null; then
+    echo "❌ Python3 未安装，请先安装Python3"
+    exit 1
+fi
+
+# 进入脚本目录
+cd "$(dirname "$0")"
+
+# 启动服务（爬虫会通过 BROWSER_SERVICE_URL 自动附加，默认 http://127.0.0.1:9230）
+python3 browser_service.py --port 9230 --debug-port 9222 --max-uses 50 --max-rss-mb 1500 --max-leases 4
@@ -8,6 +8,13 @@ from datetime import datetime, timedelta
 import os
 import sys
 
+# 共享的订阅源条件请求（../feed-common）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'feed-common'))
+from conditional_fetch import ConditionalFeedFetcher
+from feed_parser import CHUNK_SIZE, FeedEntryStream
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
 class DoubanRSSFetcher:
     def __init__(self):
         self.user_id = '284853052'
@@ -16,28 +23,41 @@ class DoubanRSSFetcher:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/rss+xml, application/xml, text/xml, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Cache-Control': 'no-cache'
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
         }
+        # 按 ETag/Last-Modified 发送条件请求，内容未变化时复用上次保存的数据
+        self.feed_fetcher = ConditionalFeedFetcher(os.path.join(CACHE_DIR, 'feed_validators.json'))
+        # 本次完整下载的 (响应, 字节数)，数据保存成功后才记录校验信息
+        self.pending_validators = None
+
+    def load_saved_collections(self):
+        """读取上次保存的收藏数据，不存在或无法读取时返回None"""
+        try:
+            with open(self.output_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('collections') or None
+        except (OSError, ValueError, AttributeError):
+            return None
 
     def fetch_rss(self):
         """获取豆瓣RSS数据"""
+        response = None
         try:
             print(f"正在获取豆瓣RSS数据: {self.rss_url}")
-            response = requests.get(self.rss_url, headers=self.headers, timeout=30)
+            saved = self.load_saved_collections()
+            # 没有可复用的数据时不发条件请求，避免收到 304 却无数据可用
+            response = self.feed_fetcher.fetch(self.rss_url, headers=self.headers, timeout=30,
+                                               conditional=saved is not None, stream=True)
+            if response.status_code == 304:
+                print("RSS内容未变化，复用上次保存的数据")
+                for item in saved:
+                    item['formattedDate'] = self.format_date(item.get('published')) if item.get('published') else ''
+                return saved
             response.raise_for_status()
             
-            # 解析XML
-            root = ET.fromstring(response.content)
-            
-            # 获取频道信息
-            channel = root.find('channel')
-            if channel is None:
-                raise Exception("无法找到RSS频道信息")
-            
-            # 解析items
+            # 流式解析items，逐条处理后即释放
             items = []
-            for item in channel.findall('item'):
+            entries = FeedEntryStream(response.iter_content(CHUNK_SIZE), 'item')
+            for item in entries:
                 title = item.find('title')
                 link = item.find('link')
                 pub_date = item.find('pubDate')
@@ -55,6 +75,11 @@ class DoubanRSSFetcher:
                 }
                 items.append(item_data)
             
+            self.feed_fetcher.record_download(self.rss_url, entries.bytes_read)
+            if not items:
+                raise Exception("RSS中没有任何条目")
+            
+            self.pending_validators = (response, entries.bytes_read)
             return items
             
         except requests.RequestException as e:
@@ -66,6 +91,10 @@ class DoubanRSSFetcher:
         except Exception as e:
             print(f"获取RSS数据失败: {e}")
             return []
+        finally:
+            # 流式响应可能未读完，释放连接
+            if response is not None:
+                response.close()
 
     def format_date(self, date_string):
         """格式化日期"""
@@ -193,15 +222,24 @@ class DoubanRSSFetcher:
         if not collections:
             print("RSS获取失败，使用模拟数据")
             collections = self.get_mock_data()
+            # 保存的将是模拟数据，下次必须完整请求
+            self.feed_fetcher.invalidate(self.rss_url)
         
         # 保存数据
         success = self.save_data(collections)
         
         if success:
+            if self.pending_validators:
+                response, size = self.pending_validators
+                self.feed_fetcher.commit(self.rss_url, response, size)
             print("✅ 豆瓣RSS数据抓取完成！")
         else:
             print("❌ 数据保存失败")
         
+        stats = self.feed_fetcher.summary(self.rss_url)
+        print(f"RSS条件请求统计: 请求 {stats['requests']} 次，未变化 {stats['not_modified']} 次"
+              f"（命中率 {stats['hit_rate']}），累计下载 {stats['kb_downloaded']} KB，节省 {stats['kb_saved']} KB")
+        
         return success
 
 def main():
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅源条件请求
+按 URL 记录 ETag/Last-Modified，请求时带上 If-None-Match/If-Modified-Since；
+返回 304 时调用方直接复用上次保存的数据，不再下载和解析。同时记录每个源的命中率和节省的流量
+"""
+
+import json
+import os
+import time
+
+import requests
+
+
+class ConditionalFeedFetcher:
+    def __init__(self, cache_file, session=None):
+        """
+        初始化
+
+        Args:
+            cache_file: 校验信息和统计的持久化文件
+            session: 复用的 requests.Session（可选）
+        """
+        self.cache_file = cache_file
+        self.session = session or requests.Session()
+        self.feeds = self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """原子写入"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.feeds, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            print(f"保存订阅源缓存失败: {e}")
+
+    def feed(self, url):
+        return self.feeds.setdefault(url, {
+            'etag': None,
+            'last_modified': None,
+            'size': 0,
+            'requests': 0,
+            'not_modified': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0
+        })
+
+    def fetch(self, url, headers=None, timeout=15, conditional=True, stream=False):
+        """
+        请求订阅源，conditional 为真且有上次的校验信息时发送条件请求
+
+        Returns:
+            requests.Response；状态码为 304 时表示内容未变化。
+            stream=True 时响应体需由调用方读取，读取完后调用 record_download 记录流量
+        """
+        feed = self.feed(url)
+        request_headers = dict(headers or {})
+        if conditional:
+            if feed['etag']:
+                request_headers['If-None-Match'] = feed['etag']
+            if feed['last_modified']:
+                request_headers['If-Modified-Since'] = feed['last_modified']
+
+        response = self.session.get(url, headers=request_headers, timeout=timeout, stream=stream)
+        feed['requests'] += 1
+        if response.status_code == 304:
+            feed['not_modified'] += 1
+            feed['bytes_saved'] += feed['size']
+        elif not stream:
+            feed['bytes_downloaded'] += len(response.content)
+        self.save()
+        return response
+
+    def record_download(self, url, size):
+        """记录流式读取的响应体大小"""
+        self.feed(url)['bytes_downloaded'] += size
+        self.save()
+
+    def commit(self, url, response, size):
+        """
+        数据成功保存后再记录本次响应的校验信息和响应体大小；
+        解析或保存失败时不调用，下次仍会完整下载
+        """
+        feed = self.feed(url)
+        feed['etag'] = response.headers.get('ETag')
+        feed['last_modified'] = response.headers.get('Last-Modified')
+        feed['size'] = size
+        feed['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.save()
+
+    def invalidate(self, url):
+        """丢弃校验信息（保存的数据已不是该源的真实内容，如回退到模拟数据时）"""
+        feed = self.feed(url)
+        feed['etag'] = None
+        feed['last_modified'] = None
+        self.save()
+
+    def summary(self, url):
+        """单个订阅源的统计"""
+        feed = self.feed(url)
+        return {
+            'requests': feed['requests'],
+            'not_modified': feed['not_modified'],
+            'hit_rate': round(feed['not_modified'] / feed['requests'], 3) if feed['requests'] else None,
+            'kb_downloaded': round(feed['bytes_downloaded'] / 1024, 1),
+            'kb_saved': round(feed['bytes_saved'] / 1024, 1)
+        }
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订阅源流式解析
+用 XMLPullParser 按块增量解析响应体，每解析完一个条目就交给调用方并立即释放，
+不构建整棵文档树；达到数量上限或遇到已知条目时停止读取剩余内容
+"""
+
+import xml.etree.ElementTree as ET
+
+# 每次从响应中读取的字节数
+CHUNK_SIZE = 16 * 1024
+
+
+class FeedEntryStream:
+    def __init__(self, chunks, entry_tag, max_entries=None, known_ids=None, entry_id=None):
+        """
+        初始化
+
+        Args:
+            chunks: 响应体的字节块迭代器，如 response.iter_content(CHUNK_SIZE)
+            entry_tag: 条目标签，带命名空间时使用 {uri}name 形式，如 Atom 的 {http://www.w3.org/2005/Atom}entry
+            max_entries: 最多产出的条目数，None 表示不限
+            known_ids: 已知条目ID集合，遇到其中任意一个即停止（条目按时间倒序时其后都是旧内容）
+            entry_id: 从条目元素中取ID的函数，配合 known_ids 使用
+        """
+        self.chunks = chunks
+        self.entry_tag = entry_tag
+        self.max_entries = max_entries
+        self.known_ids = known_ids or set()
+        self.entry_id = entry_id
+        self.bytes_read = 0
+        self.count = 0
+        # 提前停止的原因：'max_entries' 或 'known_id'；读完整个响应时为 None
+        self.stopped = None
+        # 因已知条目停止时，该条目的ID
+        self.stop_id = None
+
+    def __iter__(self):
+        """
+        逐个产出条目元素；元素只在调用方处理期间有效，之后会被清空并从父节点移除
+        """
+        if self.max_entries is not None and self.max_entries <= 0:
+            self.stopped = 'max_entries'
+            return
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        # 当前打开的元素栈，用于找到条目的父节点
+        stack = []
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag != self.entry_tag:
+                    continue
+
+                if self.entry_id and self.known_ids:
+                    current_id = self.entry_id(elem)
+                    if current_id in self.known_ids:
+                        self.stopped = 'known_id'
+                        self.stop_id = current_id
+                        return
+                self.count += 1
+                yield elem
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+                if self.max_entries is not None and self.count >= self.max_entries:
+                    self.stopped = 'max_entries'
+                    return
+        parser.close()
@@ -9,6 +9,13 @@ import json
 import time
 import os
 import re
+import sys
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -16,15 +23,256 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+from search_index import ArticleIndex
+
+# 可选：附加到常驻浏览器服务（../browser-service），服务不可用时本地启动Chrome
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'browser-service'))
+try:
+    from browser_service import BrowserServiceClient
+    from driver_cache import resolve_chromedriver
+    from page_ready import PageReadiness
+    from resource_blocking import ResourceBlocker, LOGGING_PREFS_CAPABILITY
+except ImportError:
+    BrowserServiceClient = None
+    resolve_chromedriver = None
+    PageReadiness = None
+    ResourceBlocker = None
+
+# 有 lxml 时使用更快的解析器
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 检查点超过此时长（秒）没有写入新记录视为过期，--resume 时不再使用
+CHECKPOINT_MAX_AGE = 24 * 3600
+
+# 列表页文章链接对应的选择器，用于就绪检测
+ARTICLE_LINK_SELECTOR = 'a[href^="/p/"]'
+
+class ArticleStreamWriter:
+    """逐篇追加写入JSONL，每篇写完即flush，中途中断时已抓取的文章不会丢失"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+    
+    def __enter__(self):
+        self.file = open(self.path, 'w', encoding='utf-8')
+        return self
+    
+    def write(self, article):
+        self.file.write(json.dumps(article, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.count += 1
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        return False
+
+class CrawlCheckpoint:
+    """
+    抓取检查点：追加写入的JSONL日志，每篇文章、每页结束各写一行，--resume 时重放
+    
+    首行记录抓取参数和创建时间，参数不一致或超过 max_age 没有新记录（按文件修改时间）的检查点不会被重放；
+    每行用一次 write 写入并立即 flush，每 sync_every 行 fsync 一次；
+    进程中断时最后一行可能不完整，读取时直接忽略
+    """
+    
+    def __init__(self, path, params=None, max_age=CHECKPOINT_MAX_AGE, sync_every=5):
+        self.path = path
+        self.params = params or {}
+        self.max_age = max_age
+        self.sync_every = max(1, sync_every)
+        self.file = None
+        self.pending = 0
+        # 为真时首次写入会覆盖旧文件并写入参数行；成功 load 后改为继续追加
+        self.fresh = True
+    
+    def load(self):
+        """
+        重放日志，返回 (已完成的最后一页, seen_links, 已解析的文章列表)；
+        检查点不存在、参数不一致或已过期时返回空状态，之后的写入会重新开始
+        """
+        last_page = 0
+        seen_links = set()
+        articles = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = iter(f)
+                try:
+                    meta = json.loads(next(lines, ''))
+                except ValueError:
+                    meta = {}
+                if meta.get('type') != 'meta' or meta.get('params') != self.params:
+                    print("检查点的抓取参数与本次不一致，忽略")
+                    return last_page, seen_links, articles
+                # 按最后一次写入计算，仍在推进的长时间回填不会因开始得早而被丢弃
+                if time.time() - os.path.getmtime(self.path) > self.max_age:
+                    print("检查点长时间没有更新，已过期，忽略")
+                    return last_page, seen_links, articles
+                self.fresh = False
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get('type') == 'article':
+                        articles.append(record['article'])
+                        seen_links.add(record['article']['link'])
+                    elif record.get('type') == 'page':
+                        last_page = max(last_page, record['page'])
+                        seen_links.update(record.get('links') or [])
+        except OSError:
+            pass
+        return last_page, seen_links, articles
+    
+    def append(self, record):
+        if self.file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.file = open(self.path, 'w' if self.fresh else 'a', encoding='utf-8')
+            if self.fresh:
+                self.fresh = False
+                self.append({'type': 'meta', 'params': self.params, 'created_at': time.time()})
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self.sync()
+    
+    def sync(self):
+        if self.file is not None and self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+    
+    def add_article(self, article):
+        # 正文只用于全文索引，不写入检查点
+        self.append({'type': 'article', 'article': {k: v for k, v in article.items() if k != 'body'}})
+    
+    def finish_page(self, page, links):
+        self.append({'type': 'page', 'page': page, 'links': links})
+        self.sync()
+    
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+    
+    def clear(self):
+        """抓取完整结束后删除检查点"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
 
 class JianshuSpider:
-    def __init__(self, user_id):
+    def __init__(self, user_id, block_resources=True, use_http=False, detail_concurrency=8, capture_body=False):
         self.user_id = user_id
         self.base_url = f"https://www.jianshu.com/u/{user_id}"
         self.output_file = "jianshu_articles.json"
+        # 抓取过程中逐篇写入的进度文件
+        self.stream_file = "jianshu_articles.jsonl"
+        # HTTP模式：直接请求文章列表接口并解析HTML，不启动浏览器
+        self.use_http = use_http
+        # 并发请求详情页的线程数（同时也是连接池大小）
+        self.detail_concurrency = max(1, detail_concurrency)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'zh-CN,zh;q=0.9'
+        })
+        # 抓取正文并写入全文索引（所有文章都会请求详情页，未变化的由条件请求跳过）
+        self.capture_body = capture_body
+        self.search_index = ArticleIndex(os.path.join(CACHE_DIR, 'search_index.sqlite3')) if capture_body else None
+        # 详情页校验缓存 {slug: {etag, last_modified, content_hash, published_at, ...}}，用于条件请求
+        self.validator_file = os.path.join(CACHE_DIR, 'article_validators.json')
+        self.validators = None
+        self.validator_lock = threading.Lock()
+        self.reset_detail_stats()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.detail_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.browser_client = None
+        self.readiness = None
+        # 屏蔽图片、字体、音视频和统计脚本的下载（只读取文本和属性值）
+        self.block_resources = block_resources and ResourceBlocker is not None
+        self.resource_blocker = None
+        self.crawl_failed = False
+        # 本次产出的是模拟数据（driver 启动失败），不能合并进已有数据集
+        self.used_mock = False
         
+    def reset_detail_stats(self):
+        """详情页条件请求的计数，每次抓取开始时清零（统计的是单次运行的节省）"""
+        self.detail_stats = {
+            'requests': 0,
+            'not_modified': 0,
+            'unchanged': 0,
+            'parsed': 0,
+            'bytes_downloaded': 0,
+            'bytes_saved': 0,
+            'parse_seconds': 0.0,
+            'parse_seconds_saved': 0.0
+        }
+    
+    def attach_browser_service(self, service=None):
+        """尝试附加到常驻浏览器服务，成功时返回在独立标签页中工作的driver"""
+        if BrowserServiceClient is None:
+            return None
+        
+        client = BrowserServiceClient(client_name='jianshu-spider')
+        try:
+            capabilities = dict([LOGGING_PREFS_CAPABILITY]) if self.block_resources else None
+            driver = client.attach_driver(service=service, capabilities=capabilities)
+        except Exception as e:
+            print(f"附加到浏览器服务失败: {e}")
+            return None
+        
+        if driver:
+            self.browser_client = client
+            print("已附加到常驻浏览器服务")
+        return driver
+    
+    def close_driver(self, driver):
+        """关闭驱动（附加到浏览器服务时只关闭自己的标签页并归还租约）"""
+        if self.browser_client:
+            self.browser_client.detach_driver(driver)
+            self.browser_client = None
+        else:
+            driver.quit()
+    
+    def get_driver_service(self):
+        """解析chromedriver（优先复用本地缓存，Chrome未变化时不联网），返回Service或None"""
+        try:
+            if resolve_chromedriver is None:
+                return Service(ChromeDriverManager().install())
+            
+            driver_path, info = resolve_chromedriver()
+            print(f"ChromeDriver解析耗时 {info['resolve_seconds']}s "
+                  f"(缓存命中: {info['cache_hit']}, Chrome版本: {info['chrome_version']})")
+            return Service(driver_path) if driver_path else None
+        except Exception as e:
+            print(f"自动下载ChromeDriver失败: {e}")
+            return None
+    
     def setup_driver(self):
         """设置Chrome浏览器驱动"""
+        service = self.get_driver_service()
+        
+        # 优先使用常驻浏览器服务，避免每次冷启动Chrome
+        driver = self.attach_browser_service(service)
+        if driver:
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            return driver
+        
         options = webdriver.ChromeOptions()
         options.add_argument('--headless')  # 无头模式，不显示浏览器窗口
         options.add_argument('--disable-gpu')
@@ -37,14 +285,20 @@ class JianshuSpider:
         options.add_experimental_option('useAutomationExtension', False)
         
         # 设置用户代理
-        options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        options.add_argument(f'--user-agent={USER_AGENT}')
+        
+        # DOMContentLoaded 后即返回，数据是否就绪由 wait_for_selector 判断
+        options.page_load_strategy = 'eager'
+        if self.block_resources:
+            # 开启 performance 日志，用于统计被屏蔽的请求
+            options.set_capability(*LOGGING_PREFS_CAPABILITY)
         
         try:
-            # 尝试使用webdriver-manager自动下载驱动
-            service = Service(ChromeDriverManager().install())
+            if service is None:
+                raise RuntimeError("未解析到ChromeDriver")
             driver = webdriver.Chrome(service=service, options=options)
         except Exception as e:
-            print(f"自动下载ChromeDriver失败: {e}")
+            print(f"使用解析到的ChromeDriver启动失败: {e}")
             print("尝试使用系统ChromeDriver...")
             try:
                 # 尝试使用系统ChromeDriver
@@ -59,6 +313,28 @@ class JianshuSpider:
         
         return driver
     
+    def wait_for_selector(self, selectors, budget):
+        """等待任一选择器出现（替代固定sleep），budget 为原固定等待时长，用于统计节省的时间"""
+        if self.readiness is None:
+            time.sleep(budget)
+            return None
+        result = self.readiness.wait_for_selector(selectors, budget=budget)
+        if self.readiness.last_error is not None:
+            # 就绪脚本本身执行失败（如页面 CSP），退回原来的固定等待
+            print(f"就绪检测脚本执行失败，改用固定等待: {self.readiness.last_error}")
+            time.sleep(budget)
+        return result
+    
+    def wait_for_network_idle(self, budget):
+        """等待网络空闲（替代固定sleep）"""
+        if self.readiness is None:
+            time.sleep(budget)
+            return False
+        idle = self.readiness.wait_for_network_idle(budget=budget)
+        if self.readiness.last_error is not None:
+            time.sleep(budget)
+        return idle
+    
     def parse_time_string(self, time_str):
         """解析时间字符串为datetime对象"""
         if not time_str:
@@ -117,146 +393,386 @@ class JianshuSpider:
         # 如果无法解析，返回None
         return None
     
-    def fetch_articles(self, max_articles=10):
-        """抓取简书文章"""
-        driver = self.setup_driver()
+    def make_article(self, title, link, published_at):
+        """构造与 save_articles 一致的文章格式"""
+        return {
+            'title': title,
+            'link': link,
+            'slug': link.split('/p/')[-1] if '/p/' in link else '',
+            'published_at': published_at.isoformat(),
+            'fetched_at': datetime.now().isoformat(),
+            'user_id': self.user_id
+        }
+    
+    def fetch_list_page(self, page):
+        """请求按分享时间排序的文章列表第 page 页，返回HTML片段；失败返回None"""
+        url = f"{self.base_url}?order_by=shared_at&page={page}"
+        try:
+            # 带 X-Requested-With 时只返回文章列表片段，不含整页框架
+            response = self.session.get(url, headers={'X-Requested-With': 'XMLHttpRequest',
+                                                      'Referer': self.base_url}, timeout=10)
+        except requests.RequestException as e:
+            print(f"请求文章列表第 {page} 页失败: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"文章列表第 {page} 页返回状态码 {response.status_code}")
+            return None
+        return response.text
+    
+    def parse_list_page(self, html):
+        """解析文章列表HTML，返回 [{title, link, shared_at}]（shared_at 为列表上的分享时间）"""
+        soup = BeautifulSoup(html, HTML_PARSER)
+        items = []
+        seen = set()
+        links = soup.select('a.title[href^="/p/"]') or soup.select(ARTICLE_LINK_SELECTOR)
+        for anchor in links:
+            href = anchor.get('href', '').split('?')[0]
+            title = anchor.get_text(strip=True)
+            if not title or href in seen:
+                continue
+            seen.add(href)
+            
+            shared_at = None
+            container = anchor.find_parent('li')
+            if container is not None:
+                time_element = container.select_one('[data-shared-at]')
+                if time_element is not None:
+                    shared_at = time_element.get('data-shared-at')
+                else:
+                    time_element = container.select_one('.time')
+                    shared_at = time_element.get_text(strip=True) if time_element is not None else None
+            
+            items.append({
+                'title': title,
+                'link': f"https://www.jianshu.com{href}",
+                'shared_at': shared_at
+            })
+        return items
+    
+    def parse_article_page(self, html):
+        """
+        从文章详情页HTML中一次解析出发布时间（<time datetime> 或 article:published_time）
+        和正文（仅 capture_body 时），返回 (published_at, body)
+        """
+        soup = BeautifulSoup(html, HTML_PARSER)
+        body = None
+        if self.capture_body:
+            article = soup.select_one('article') or soup.select_one('.show-content, .note')
+            if article is not None:
+                body = article.get_text('\n', strip=True)
         
-        # 如果driver设置失败，返回模拟数据
-        if driver is None:
-            print("ChromeDriver设置失败，返回模拟数据")
-            return self.get_mock_articles(max_articles)
+        time_element = soup.select_one('time[datetime]')
+        if time_element is not None:
+            return self.parse_time_string(time_element['datetime']), body
+        meta = soup.select_one("meta[property='article:published_time']")
+        if meta is not None and meta.get('content'):
+            return self.parse_time_string(meta['content']), body
+        time_element = soup.select_one('time, span.publish-time')
+        if time_element is not None:
+            return self.parse_time_string(time_element.get_text(strip=True)), body
+        return None, body
+    
+    def load_validators(self):
+        if self.validators is None:
+            try:
+                with open(self.validator_file, 'r', encoding='utf-8') as f:
+                    self.validators = json.load(f)
+            except (OSError, ValueError):
+                self.validators = {}
+        return self.validators
+    
+    def save_validators(self):
+        """原子写入详情页校验缓存"""
+        if self.validators is None:
+            return
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with self.validator_lock:
+                tmp_file = self.validator_file + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.validators, f, ensure_ascii=False)
+                os.replace(tmp_file, self.validator_file)
+        except OSError as e:
+            print(f"保存详情页校验缓存失败: {e}")
+    
+    def record_detail(self, **counts):
+        with self.validator_lock:
+            for key, value in counts.items():
+                self.detail_stats[key] += value
+    
+    def fetch_article_detail(self, link, force=False):
+        """
+        请求文章详情页，返回 (published_at, body)，失败返回None
         
-        articles = []
-        seen_links = set()
+        带上次的 ETag/Last-Modified 发送条件请求：304 或内容哈希未变时直接使用缓存结果，不再解析
+        （此时 body 为None，表示正文未变化）；force 为真时不发条件请求、总是解析
+        """
+        slug = link.split('/p/')[-1].split('?')[0]
+        with self.validator_lock:
+            cached = {} if force else dict(self.load_validators().get(slug) or {})
+        headers = {}
+        if cached.get('published_at'):
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
         
         try:
-            print(f"正在访问简书用户页面: {self.base_url}")
-            driver.get(self.base_url)
+            response = self.session.get(link, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            print(f"获取发布时间失败 {link}: {e}")
+            return None
+        self.record_detail(requests=1, bytes_downloaded=len(response.content))
+        
+        if response.status_code == 304 and cached.get('published_at'):
+            self.record_detail(not_modified=1, bytes_saved=cached.get('size', 0),
+                               parse_seconds_saved=cached.get('parse_seconds', 0))
+            return datetime.fromisoformat(cached['published_at']), None
+        if response.status_code != 200:
+            print(f"获取发布时间失败 {link}: 状态码 {response.status_code}")
+            return None
+        
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if content_hash == cached.get('content_hash') and cached.get('published_at'):
+            self.record_detail(unchanged=1, parse_seconds_saved=cached.get('parse_seconds', 0))
+            published_at, body = datetime.fromisoformat(cached['published_at']), None
+        else:
+            start = time.time()
+            published_at, body = self.parse_article_page(response.text)
+            parse_seconds = time.time() - start
+            self.record_detail(parsed=1, parse_seconds=parse_seconds)
+            cached.update(content_hash=content_hash, size=len(response.content),
+                          parse_seconds=round(parse_seconds, 4),
+                          published_at=published_at.isoformat() if published_at else None)
+        
+        cached.update(etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'))
+        with self.validator_lock:
+            self.load_validators()[slug] = cached
+        return published_at, body
+    
+    def detail_summary(self):
+        """详情页条件请求统计"""
+        stats = dict(self.detail_stats)
+        stats['kb_downloaded'] = round(stats.pop('bytes_downloaded') / 1024, 1)
+        stats['kb_saved'] = round(stats.pop('bytes_saved') / 1024, 1)
+        stats['parse_seconds'] = round(stats['parse_seconds'], 3)
+        stats['parse_seconds_saved'] = round(stats['parse_seconds_saved'], 3)
+        return stats
+    
+    def find_list_time(self, element):
+        """从列表页文章条目中读取时间文本（详情页获取失败时的回退）"""
+        try:
+            parent = element.find_element(By.XPATH, "./ancestor::li | ./ancestor::div[contains(@class, 'item')]")
+            time_elements = parent.find_elements(By.XPATH, ".//span[contains(text(), '发表') or contains(text(), '年') or contains(text(), '月') or contains(@class, 'time')]")
+            if time_elements:
+                return self.parse_time_string(time_elements[0].text)
+        except Exception:
+            pass
+        return None
+    
+    def iter_resolved(self, items):
+        """
+        为一页列表项补全发布时间，按列表顺序逐篇产出文章（只产出有发布时间的）
+        
+        列表上已带分享时间的不请求详情页；其余提交到线程池并发请求，按顺序等待各自结果，
+        第一篇就绪即可产出；消费方提前停止时取消尚未开始的请求
+        """
+        times = {item['link']: self.parse_time_string(item.get('shared_at')) for item in items}
+        # 抓取正文时所有文章都请求详情页；索引中还没有的文章不能用缓存跳过
+        pending = [link for link, published_at in times.items() if self.capture_body or not published_at]
+        forced = {link for link in pending
+                  if self.search_index is not None and not self.search_index.has(link.split('/p/')[-1])}
+        executor = ThreadPoolExecutor(max_workers=min(self.detail_concurrency, len(pending))) if pending else None
+        futures = {link: executor.submit(self.fetch_article_detail, link, link in forced) for link in pending}
+        
+        try:
+            for item in items:
+                published_at = times.get(item['link'])
+                body = None
+                if item['link'] in futures:
+                    detail = futures[item['link']].result()
+                    if detail:
+                        published_at = published_at or detail[0]
+                        body = detail[1]
+                if not published_at and item.get('element') is not None:
+                    published_at = self.find_list_time(item['element'])
+                if published_at:
+                    print(f"已抓取: {item['title']} (发布于: {published_at.strftime('%Y-%m-%d %H:%M')})")
+                    article = self.make_article(item['title'], item['link'], published_at)
+                    if body:
+                        article['body'] = body
+                    yield article
+                else:
+                    print(f"跳过: {item['title']} (无法获取发布时间)")
+        finally:
+            if executor is not None:
+                for future in futures.values():
+                    future.cancel()
+                executor.shutdown(wait=False)
+    
+    def iter_list_pages_http(self, start_page=1, seen_links=None):
+        """HTTP模式：从 start_page 起逐页请求文章列表，产出 (页码, 本页新列表项)"""
+        seen_links = set(seen_links or ())
+        previous_links = None
+        page = start_page
+        while True:
+            print(f"正在请求第 {page} 页...")
+            html = self.fetch_list_page(page)
+            if html is None:
+                self.crawl_failed = True
+                return
             
-            # 等待页面加载
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
+            # 超出最后一页时简书会返回空列表或重复内容
+            page_items = self.parse_list_page(html)
+            page_links = [item['link'] for item in page_items]
+            if not page_items or page_links == previous_links:
+                print("没有更多文章了")
+                return
+            previous_links = page_links
+            items = [item for item in page_items if item['link'] not in seen_links]
+            seen_links.update(page_links)
+            yield page, items
+            page += 1
+    
+    def iter_list_pages_browser(self, driver, start_page=1, seen_links=None):
+        """浏览器模式：在列表页上收集每页的新链接（不离开列表页），产出 (页码, 本页新列表项) 后再翻页"""
+        seen_links = set(seen_links or ())
+        url = self.base_url if start_page == 1 else f"{self.base_url}?order_by=shared_at&page={start_page}"
+        print(f"正在访问简书用户页面: {url}")
+        driver.get(url)
+        
+        # 等待页面加载
+        wait = WebDriverWait(driver, 10)
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "body")))
+        
+        print("页面加载完成，开始抓取文章...")
+        
+        page = start_page
+        while True:
+            print(f"正在抓取第 {page} 页...")
             
-            print("页面加载完成，开始抓取文章...")
+            # 等待文章列表加载
+            self.wait_for_selector(ARTICLE_LINK_SELECTOR, budget=3)
             
-            page = 1
-            while len(articles) < max_articles:
-                print(f"正在抓取第 {page} 页...")
-                
-                # 等待文章列表加载
-                time.sleep(3)
-                
-                # 查找文章链接
-                article_elements = driver.find_elements(By.CSS_SELECTOR, 'a[href^="/p/"]')
-                
-                for element in article_elements:
-                    if len(articles) >= max_articles:
-                        break
-                        
-                    try:
-                        title = element.text.strip()
-                        link = element.get_attribute('href')
-                        
-                        if title and link and link not in seen_links:
-                            # 访问文章详情页获取准确的发布时间
-                            published_at = None
-                            try:
-                                # 保存当前URL
-                                current_url = driver.current_url
-                                
-                                # 访问文章详情页
-                                if not link.startswith('http'):
-                                    full_link = f"https://www.jianshu.com{link}"
-                                else:
-                                    full_link = link
-                                
-                                driver.get(full_link)
-                                time.sleep(2)  # 等待页面加载
-                                
-                                # 尝试多种方式获取发布时间
-                                try:
-                                    # 方式1: 查找time标签
-                                    time_element = driver.find_element(By.CSS_SELECTOR, "time")
-                                    datetime_attr = time_element.get_attribute('datetime')
-                                    if datetime_attr:
-                                        published_at = self.parse_time_string(datetime_attr)
-                                    else:
-                                        time_text = time_element.text
-                                        published_at = self.parse_time_string(time_text)
-                                except:
-                                    try:
-                                        # 方式2: 查找包含时间的元素
-                                        time_elements = driver.find_elements(By.XPATH, "//span[contains(@class, 'publish-time') or contains(text(), '发表') or contains(text(), '年')]")
-                                        if time_elements:
-                                            time_text = time_elements[0].text
-                                            published_at = self.parse_time_string(time_text)
-                                    except:
-                                        try:
-                                            # 方式3: 从meta标签获取
-                                            meta_time = driver.find_element(By.CSS_SELECTOR, "meta[property='article:published_time']")
-                                            datetime_attr = meta_time.get_attribute('content')
-                                            if datetime_attr:
-                                                published_at = self.parse_time_string(datetime_attr)
-                                        except:
-                                            pass
-                                
-                                # 返回列表页
-                                driver.get(current_url)
-                                time.sleep(1)
-                                
-                            except Exception as e:
-                                print(f"获取发布时间失败 {link}: {e}")
-                                # 如果获取失败，尝试从列表页获取
-                                try:
-                                    parent = element.find_element(By.XPATH, "./ancestor::li | ./ancestor::div[contains(@class, 'item')]")
-                                    time_elements = parent.find_elements(By.XPATH, ".//span[contains(text(), '发表') or contains(text(), '年') or contains(text(), '月') or contains(@class, 'time')]")
-                                    if time_elements:
-                                        time_text = time_elements[0].text
-                                        published_at = self.parse_time_string(time_text)
-                                except:
-                                    pass
-                            
-                            # 只保存有实际发布时间的文章
-                            if published_at:
-                                article_data = {
-                                    'title': title,
-                                    'link': link,
-                                    'slug': link.split('/p/')[-1] if '/p/' in link else '',
-                                    'published_at': published_at.isoformat(),
-                                    'fetched_at': datetime.now().isoformat(),
-                                    'user_id': self.user_id
-                                }
-                                articles.append(article_data)
-                                seen_links.add(link)
-                                print(f"已抓取: {title} (发布于: {published_at.strftime('%Y-%m-%d %H:%M')})")
-                            else:
-                                print(f"跳过: {title} (无法获取发布时间)")
-                    except Exception as e:
-                        print(f"抓取文章时出错: {e}")
-                        continue
-                
-                # 尝试翻到下一页
+            # 查找文章链接
+            article_elements = driver.find_elements(By.CSS_SELECTOR, ARTICLE_LINK_SELECTOR)
+            
+            items = []
+            for element in article_elements:
                 try:
-                    next_button = driver.find_element(By.CSS_SELECTOR, 'a[rel="next"]')
-                    if next_button and next_button.is_displayed():
-                        next_button.click()
-                        page += 1
-                        time.sleep(2)
-                    else:
-                        print("没有更多页面了")
-                        break
-                except Exception:
-                    print("无法找到下一页按钮，停止抓取")
-                    break
+                    title = element.text.strip()
+                    link = element.get_attribute('href')
+                except Exception as e:
+                    print(f"读取文章链接时出错: {e}")
+                    continue
+                if title and link and link not in seen_links:
+                    seen_links.add(link)
+                    if not link.startswith('http'):
+                        link = f"https://www.jianshu.com{link}"
+                    items.append({'title': title, 'link': link, 'element': element})
+            yield page, items
             
-            print(f"抓取完成，共获取 {len(articles)} 篇文章")
+            # 尝试翻到下一页
+            try:
+                next_button = driver.find_element(By.CSS_SELECTOR, 'a[rel="next"]')
+                if next_button and next_button.is_displayed():
+                    next_button.click()
+                    page += 1
+                    self.wait_for_network_idle(budget=2)
+                else:
+                    print("没有更多页面了")
+                    return
+            except Exception:
+                print("无法找到下一页按钮，停止抓取")
+                return
+    
+    def iter_articles(self, max_articles=None, checkpoint=None, resume=False):
+        """
+        逐篇产出已补全发布时间的文章（按列表顺序），消费方可随时停止迭代
+        
+        停止后不再翻页、不再请求剩余详情页，浏览器模式下同时关闭driver
+        
+        Args:
+            max_articles: 最多产出的文章数，None 表示不限
+            checkpoint: CrawlCheckpoint，提供时把新解析的文章和完成的页写入检查点
+            resume: 为真时先产出检查点中已解析的文章，并从最后完成的页之后继续
+        """
+        # 抓取是否因出错提前结束（此时保留检查点，下次继续）
+        self.crawl_failed = False
+        self.used_mock = False
+        self.reset_detail_stats()
+        driver = None
+        if not self.use_http:
+            driver = self.setup_driver()
+            # 如果driver设置失败，返回模拟数据
+            if driver is None:
+                print("ChromeDriver设置失败，返回模拟数据")
+                self.crawl_failed = True
+                self.used_mock = True
+                yield from self.get_mock_articles(max_articles or 10)
+                return
+            self.readiness = PageReadiness(driver) if PageReadiness else None
+            if self.block_resources:
+                self.resource_blocker = ResourceBlocker(driver, 'jianshu')
+                self.resource_blocker.apply()
+        
+        start_page, seen_links, resumed = 1, set(), []
+        if checkpoint is not None and resume:
+            last_page, seen_links, resumed = checkpoint.load()
+            start_page = last_page + 1
+            if resumed or last_page:
+                print(f"从检查点恢复: 已完成 {last_page} 页，已解析 {len(resumed)} 篇文章")
+        
+        if self.use_http:
+            pages = self.iter_list_pages_http(start_page, seen_links)
+        else:
+            pages = self.iter_list_pages_browser(driver, start_page, seen_links)
+        
+        count = 0
+        start = time.time()
+        try:
+            for article in resumed:
+                count += 1
+                yield article
+                if max_articles and count >= max_articles:
+                    return
             
+            for page, items in pages:
+                resolved = self.iter_resolved(items)
+                try:
+                    for article in resolved:
+                        count += 1
+                        if checkpoint is not None:
+                            checkpoint.add_article(article)
+                        yield article
+                        if max_articles and count >= max_articles:
+                            return
+                finally:
+                    resolved.close()
+                if checkpoint is not None:
+                    checkpoint.finish_page(page, [item['link'] for item in items])
         except Exception as e:
             print(f"抓取过程中出错: {e}")
+            self.crawl_failed = True
         finally:
-            driver.quit()
-        
-        return articles
+            pages.close()
+            if checkpoint is not None:
+                checkpoint.close()
+            print(f"抓取结束，共产出 {count} 篇文章，耗时 {time.time() - start:.2f}s")
+            if self.detail_stats['requests']:
+                print(f"详情页条件请求统计: {self.detail_summary()}")
+            self.save_validators()
+            if driver is not None:
+                if self.readiness is not None:
+                    print(f"页面就绪等待统计: {self.readiness.summary()}")
+                if self.resource_blocker is not None:
+                    print(f"资源屏蔽统计: {self.resource_blocker.summary()}")
+                    self.resource_blocker = None
+                self.close_driver(driver)
+    
+    def fetch_articles(self, max_articles=10):
+        """抓取简书文章"""
+        return list(self.iter_articles(max_articles))
     
     def get_mock_articles(self, max_articles=10):
         """获取模拟文章数据（当ChromeDriver不可用时）"""
@@ -303,6 +819,15 @@ class JianshuSpider:
         
         return mock_articles[:max_articles]
     
+    def load_saved_articles(self):
+        """读取上次保存的文章列表"""
+        output_path = os.path.join(os.path.dirname(__file__), self.output_file)
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('articles') or []
+        except (OSError, ValueError, AttributeError):
+            return []
+    
     def save_articles(self, articles):
         """保存文章数据到JSON文件"""
         output_path = os.path.join(os.path.dirname(__file__), self.output_file)
@@ -320,12 +845,60 @@ class JianshuSpider:
         print(f"文章数据已保存到: {output_path}")
         return output_path
     
-    def run(self, max_articles=10):
-        """运行抓取任务"""
+    def run(self, max_articles=10, until_known=False, resume=False):
+        """
+        运行抓取任务，文章边抓取边写入 stream_file
+        
+        Args:
+            max_articles: 最大抓取文章数量
+            until_known: 遇到上次已保存的文章即停止，并把新文章合并到已有数据前面
+            resume: 从上次未完成的检查点继续（用于长时间的回填抓取）；
+                默认每次从第一页重新开始，避免沿用过时的文章
+        """
         print(f"开始抓取简书用户 {self.user_id} 的文章...")
-        print(f"目标抓取数量: {max_articles} 篇")
+        print(f"目标抓取数量: {max_articles or '不限'} 篇")
         
-        articles = self.fetch_articles(max_articles)
+        saved_articles = self.load_saved_articles() if until_known else []
+        known_slugs = {article.get('slug') for article in saved_articles}
+        articles = []
+        stream_path = os.path.join(os.path.dirname(__file__), self.stream_file)
+        # 中途失败时保留检查点，可用 resume 继续；参数不同的检查点不会被重放，成功保存后删除
+        checkpoint = CrawlCheckpoint(
+            os.path.join(CACHE_DIR, f'checkpoint_{self.user_id}.jsonl'),
+            params={
+                'mode': 'http' if self.use_http else 'browser',
+                'max_articles': max_articles,
+                'until_known': until_known
+            }
+        )
+        with ArticleStreamWriter(stream_path) as writer:
+            for article in self.iter_articles(max_articles, checkpoint=checkpoint, resume=resume):
+                if article['slug'] in known_slugs:
+                    print(f"遇到已抓取的文章 {article['title']}，停止抓取")
+                    break
+                # 正文只写入全文索引，不放进输出的JSON
+                body = article.pop('body', None)
+                if body and self.search_index is not None:
+                    self.search_index.add(dict(article, body=body))
+                articles.append(article)
+                writer.write(article)
+        
+        if self.search_index is not None:
+            self.search_index.commit()
+            print(f"全文索引更新: {self.search_index.stats}")
+        
+        if self.crawl_failed and not self.used_mock:
+            print(f"⚠️ 抓取未完整结束，检查点已保留，加 --resume 重新运行可从断点继续: {checkpoint.path}")
+        
+        if until_known and self.used_mock:
+            # 抓取失败时不把模拟数据合并进已有数据集，保留原文件不动
+            print("❌ 抓取失败，已有数据集保持不变")
+            return articles
+        
+        if until_known:
+            print(f"新增 {len(articles)} 篇文章")
+            new_slugs = {article['slug'] for article in articles}
+            articles = articles + [article for article in saved_articles if article.get('slug') not in new_slugs]
         
         if articles:
             output_path = self.save_articles(articles)
@@ -341,17 +914,37 @@ class JianshuSpider:
         else:
             print("❌ 未能抓取到任何文章")
         
+        if not self.crawl_failed:
+            checkpoint.clear()
         return articles
 
 def main():
     """主函数"""
     # 配置参数
     USER_ID = "763ffbb1b873"  # 您的简书用户ID
-    MAX_ARTICLES = 10  # 最大抓取文章数量
+    MAX_ARTICLES = 10  # 最大抓取文章数量，可用 --max-articles N 修改（0 表示不限，用于回填）
+    if '--max-articles' in sys.argv and sys.argv.index('--max-articles') + 1 < len(sys.argv):
+        MAX_ARTICLES = int(sys.argv[sys.argv.index('--max-articles') + 1]) or None
+    USE_HTTP = '--http' in sys.argv  # 不启动浏览器，直接请求文章列表
+    UNTIL_KNOWN = '--until-known' in sys.argv  # 遇到已抓取过的文章即停止
+    CAPTURE_BODY = '--capture-body' in sys.argv  # 抓取正文并更新全文索引
+    RESUME = '--resume' in sys.argv  # 回填抓取：从上次未完成的检查点继续
+    
+    # 检索已建立的全文索引：--search 关键词
+    if '--search' in sys.argv and sys.argv.index('--search') + 1 < len(sys.argv):
+        query = sys.argv[sys.argv.index('--search') + 1]
+        index = ArticleIndex(os.path.join(CACHE_DIR, 'search_index.sqlite3'))
+        results, elapsed_ms = index.timed_search(query)
+        print(f"🔍 “{query}” 共 {len(results)} 条结果（{elapsed_ms} ms）")
+        for i, result in enumerate(results, 1):
+            print(f"  {i}. {result['title']} [{result['score']}] {result['link']}")
+            print(f"     {result['snippet']}")
+        index.close()
+        return results
     
     # 创建爬虫实例并运行
-    spider = JianshuSpider(USER_ID)
-    articles = spider.run(MAX_ARTICLES)
+    spider = JianshuSpider(USER_ID, use_http=USE_HTTP, capture_body=CAPTURE_BODY)
+    articles = spider.run(MAX_ARTICLES, until_known=UNTIL_KNOWN, resume=RESUME)
     
     return articles
 
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+简书文章全文索引
+SQLite 持久化的倒排索引：中文按相邻两字切分（bigram），英文和数字按词切分，BM25 排序；
+按内容哈希增量更新，只改动新增或内容变化的文章
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import re
+import sqlite3
+import time
+
+# 连续的中文字符串或英文/数字词
+TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff]+|[a-z0-9]+')
+
+# 标题中的词按此倍数计入词频
+TITLE_WEIGHT = 3
+
+# 索引格式版本，切词方式变化时递增，旧索引会被清空重建
+INDEX_VERSION = 2
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text, tail=False):
+    """
+    切词：中文按相邻两字切分（单字保持原样），英文和数字按词切分并转小写
+
+    tail 为真时（建索引用）额外把每段中文的最后一个字作为单字词，
+    这样每个字的每次出现要么是某个两字词的开头、要么是这个单字词，单字检索不会漏掉段尾的字
+    """
+    tokens = []
+    for run in TOKEN_PATTERN.findall((text or '').lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if tail:
+                tokens.append(run[-1])
+    return tokens
+
+
+class ArticleIndex:
+    def __init__(self, path):
+        """
+        打开（或创建）索引
+
+        Args:
+            path: SQLite 索引文件路径
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            # 旧格式的索引无法增量修正，清空后由下次抓取重建
+            self.conn.executescript("DROP TABLE IF EXISTS docs; DROP TABLE IF EXISTS postings;")
+            self.conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                slug TEXT PRIMARY KEY,
+                title TEXT,
+                link TEXT,
+                published_at TEXT,
+                body TEXT,
+                length INTEGER,
+                content_hash TEXT
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT,
+                slug TEXT,
+                tf INTEGER,
+                PRIMARY KEY (token, slug)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_slug ON postings (slug);
+        """)
+        self.conn.commit()
+        self.stats = {'added': 0, 'updated': 0, 'unchanged': 0}
+        # (文档数, 平均长度)，写入后失效
+        self.corpus = None
+
+    def has(self, slug):
+        return self.conn.execute("SELECT 1 FROM docs WHERE slug = ?", (slug,)).fetchone() is not None
+
+    def add(self, article):
+        """
+        写入一篇带正文（body）的文章，内容未变时不做任何改动
+
+        Returns:
+            'added'、'updated' 或 'unchanged'
+        """
+        slug = article['slug']
+        title = article.get('title') or ''
+        body = article.get('body') or ''
+        content_hash = hashlib.sha1(f"{title}\n{body}".encode('utf-8')).hexdigest()
+
+        row = self.conn.execute("SELECT content_hash FROM docs WHERE slug = ?", (slug,)).fetchone()
+        if row and row[0] == content_hash:
+            self.stats['unchanged'] += 1
+            return 'unchanged'
+
+        counts = {}
+        for token in tokenize(body, tail=True):
+            counts[token] = counts.get(token, 0) + 1
+        for token in tokenize(title, tail=True):
+            counts[token] = counts.get(token, 0) + TITLE_WEIGHT
+
+        if row:
+            self.conn.execute("DELETE FROM postings WHERE slug = ?", (slug,))
+        self.conn.executemany("INSERT INTO postings (token, slug, tf) VALUES (?, ?, ?)",
+                              [(token, slug, tf) for token, tf in counts.items()])
+        self.conn.execute("""
+            INSERT OR REPLACE INTO docs (slug, title, link, published_at, body, length, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (slug, title, article.get('link'), article.get('published_at'), body,
+              sum(counts.values()), content_hash))
+
+        result = 'updated' if row else 'added'
+        self.stats[result] += 1
+        self.corpus = None
+        return result
+
+    def commit(self):
+        self.conn.commit()
+
+    def lookup(self, token):
+        """查询一个词的倒排列表 [(slug, tf, 文档长度)]；单个汉字匹配以它开头的所有两字词和它本身（段尾单字）"""
+        if len(token) == 1 and not token.isascii():
+            return self.conn.execute("""
+                SELECT p.slug, SUM(p.tf), d.length FROM postings p JOIN docs d ON d.slug = p.slug
+                WHERE p.token >= ? AND p.token < ? GROUP BY p.slug
+            """, (token, token + '\uffff')).fetchall()
+        return self.conn.execute("""
+            SELECT p.slug, p.tf, d.length FROM postings p JOIN docs d ON d.slug = p.slug
+            WHERE p.token = ?
+        """, (token,)).fetchall()
+
+    def search(self, query, limit=10):
+        """
+        按 BM25 排序检索
+
+        Returns:
+            [{slug, title, link, published_at, score, snippet}]
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if self.corpus is None:
+            self.corpus = self.conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+        total, avg_length = self.corpus
+        if not tokens or not total:
+            return []
+
+        scores = {}
+        for token in tokens:
+            postings = self.lookup(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for slug, tf, length in postings:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[slug] = scores.get(slug, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+        results = []
+        for slug, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            title, link, published_at, body = self.conn.execute(
+                "SELECT title, link, published_at, body FROM docs WHERE slug = ?", (slug,)
+            ).fetchone()
+            results.append({
+                'slug': slug,
+                'title': title,
+                'link': link,
+                'published_at': published_at,
+                'score': round(score, 4),
+                'snippet': self.snippet(body, query)
+            })
+        return results
+
+    def snippet(self, body, query, width=60):
+        """截取正文中首个命中位置附近的片段"""
+        body = body or ''
+        positions = [body.lower().find(token) for token in tokenize(query)]
+        positions = [position for position in positions if position >= 0]
+        start = max(0, min(positions) - width // 3) if positions else 0
+        return body[start:start + width].replace('\n', ' ')
+
+    def timed_search(self, query, limit=10):
+        """检索并返回 (结果, 耗时毫秒)"""
+        start = time.perf_counter()
+        results = self.search(query, limit)
+        return results, round((time.perf_counter() - start) * 1000, 2)
+
+    def close(self):
+        self.conn.close()
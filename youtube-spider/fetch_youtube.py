@@ -8,12 +8,24 @@ YouTube 视频抓取工具
 import json
 import os
 import re
+import sys
+import time
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs
-import xml.etree.ElementTree as ET
 import requests
 from dateutil import parser as date_parser
 
+# 共享的订阅源条件请求（../feed-common）
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'feed-common'))
+from conditional_fetch import ConditionalFeedFetcher
+from feed_parser import CHUNK_SIZE, FeedEntryStream
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 频道ID不会变化，解析结果长期有效；解析失败的句柄短时间内不再重复请求频道页
+CHANNEL_ID_TTL = 30 * 24 * 3600
+CHANNEL_ID_NEGATIVE_TTL = 6 * 3600
+
 class YouTubeSpider:
     def __init__(self, channel_handle="@saai-saai"):
         """
@@ -34,12 +46,28 @@ class YouTubeSpider:
         # YouTube RSS feed URL
         # 对于 @handle 格式，使用 user 参数
         self.rss_url = f"https://www.youtube.com/feeds/videos.xml?user={self.channel_name}"
+        # 句柄 -> 频道ID 的持久缓存
+        self.channel_cache_file = os.path.join(CACHE_DIR, 'channel_ids.json')
+        # 按 ETag/Last-Modified 发送条件请求，内容未变化时复用上次保存的数据
+        self.feed_fetcher = ConditionalFeedFetcher(os.path.join(CACHE_DIR, 'feed_validators.json'))
+        # 本次请求的 RSS 地址，以及完整下载的 (响应, 字节数)，数据保存成功后才记录校验信息
+        self.feed_url = None
+        self.pending_validators = None
         
     def get_channel_id_from_handle(self):
         """
         从 @handle 获取频道ID
         通过访问频道页面并解析获取频道ID
         """
+        return self.lookup_channel_id()[0]
+    
+    def lookup_channel_id(self):
+        """
+        请求频道页解析频道ID，返回 (频道ID, 是否为确定结果)
+        
+        页面正常返回但没有频道ID、或频道不存在（404）时结果是确定的；
+        超时、连接错误、429、5xx 等临时失败返回 (None, False)，不应缓存
+        """
         try:
             channel_url = f"https://www.youtube.com/@{self.channel_name}"
             headers = {
@@ -47,21 +75,90 @@ class YouTubeSpider:
             }
             
             response = requests.get(channel_url, headers=headers, timeout=10)
+            if response.status_code == 404:
+                return None, True
             if response.status_code == 200:
                 # 尝试从页面中提取频道ID
                 # YouTube 页面中包含 <link rel="canonical" href="https://www.youtube.com/channel/CHANNEL_ID">
                 match = re.search(r'<link rel="canonical" href="https://www\.youtube\.com/channel/([^"]+)"', response.text)
                 if match:
-                    return match.group(1)
+                    return match.group(1), True
                 
                 # 或者从 meta 标签中提取
                 match = re.search(r'"channelId":"([^"]+)"', response.text)
                 if match:
-                    return match.group(1)
+                    return match.group(1), True
+                return None, True
+            print(f"获取频道ID失败，状态码: {response.status_code}")
         except Exception as e:
             print(f"获取频道ID失败: {e}")
         
-        return None
+        return None, False
+    
+    def load_channel_cache(self):
+        try:
+            with open(self.channel_cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_channel_cache(self, cache):
+        """原子写入句柄缓存"""
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_file = self.channel_cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.channel_cache_file)
+        except OSError as e:
+            print(f"保存频道ID缓存失败: {e}")
+    
+    def resolve_channel_id(self):
+        """
+        获取频道ID：优先使用缓存（成功结果长期有效，失败结果短期有效），
+        缓存过期或不存在时才请求频道页
+        """
+        # 直接传入频道ID时无需解析
+        if re.fullmatch(r'UC[\w-]{22}', self.channel_name):
+            return self.channel_name
+        
+        cache = self.load_channel_cache()
+        entry = cache.get(self.channel_name)
+        if entry:
+            age = time.time() - entry.get('resolved_at', 0)
+            if entry.get('channel_id') and age < CHANNEL_ID_TTL:
+                print(f"频道ID命中缓存: {entry['channel_id']}")
+                return entry['channel_id']
+            if not entry.get('channel_id') and age < CHANNEL_ID_NEGATIVE_TTL:
+                print("频道ID解析近期失败过，跳过频道页请求")
+                return None
+        
+        channel_id, definitive = self.lookup_channel_id()
+        # 临时失败（超时、429、5xx 等）不写入缓存，下次运行重新解析
+        if definitive:
+            cache[self.channel_name] = {'channel_id': channel_id, 'resolved_at': time.time()}
+            self.save_channel_cache(cache)
+        elif entry and entry.get('channel_id'):
+            # 频道ID不会变化，临时失败时沿用已过期的缓存
+            print(f"频道页请求失败，沿用已过期的缓存: {entry['channel_id']}")
+            return entry['channel_id']
+        return channel_id
+    
+    def load_saved_data(self, max_videos):
+        """
+        读取上次保存的数据用于复用：必须是同一频道的真实数据，
+        且当时的抓取数量不少于本次（否则条目可能不够）
+        """
+        output_path = os.path.join(os.path.dirname(__file__), self.output_file)
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(data, dict) or data.get('channel_handle') != self.channel_handle
+                or not data.get('videos') or data.get('max_videos', 0) < max_videos):
+            return None
+        return data
     
     def fetch_videos_from_rss(self, max_videos=10):
         """
@@ -71,10 +168,11 @@ class YouTubeSpider:
             max_videos: 最大获取视频数量
         """
         videos = []
+        response = None
         
         try:
             # 首先尝试使用频道ID获取RSS
-            channel_id = self.get_channel_id_from_handle()
+            channel_id = self.resolve_channel_id()
             if channel_id:
                 rss_url = f"https://www.youtube.com/feeds/videos.xml?channel_id={channel_id}"
             else:
@@ -87,21 +185,35 @@ class YouTubeSpider:
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             }
             
-            response = requests.get(rss_url, headers=headers, timeout=15)
+            self.feed_url = rss_url
+            saved = self.load_saved_data(max_videos)
+            # 没有可复用的数据时不发条件请求，避免收到 304 却无数据可用
+            response = self.feed_fetcher.fetch(rss_url, headers=headers, timeout=15,
+                                               conditional=saved is not None, stream=True)
+            
+            if response.status_code == 304:
+                print("RSS feed 未变化，复用上次保存的数据")
+                videos = saved['videos'][:max_videos]
+                return dict(saved, total_videos=len(videos), fetched_at=datetime.now().isoformat(),
+                            videos=videos)
             
             if response.status_code == 200:
-                # 解析 XML
-                root = ET.fromstring(response.content)
-                
                 # 命名空间
                 ns = {'atom': 'http://www.w3.org/2005/Atom',
                       'yt': 'http://www.youtube.com/xml/schemas/2015',
                       'media': 'http://search.yahoo.com/mrss/'}
                 
-                # 获取所有 entry（视频）
-                entries = root.findall('atom:entry', ns)
+                # 流式解析 entry（视频）：够 max_videos 个，或遇到上次已保存的视频（RSS 按发布时间倒序）即停止读取
+                saved_videos = saved['videos'] if saved else []
+                entries = FeedEntryStream(
+                    response.iter_content(CHUNK_SIZE),
+                    f"{{{ns['atom']}}}entry",
+                    max_entries=max_videos,
+                    known_ids={video.get('video_id') for video in saved_videos} - {None},
+                    entry_id=lambda entry: entry.findtext('yt:videoId', namespaces=ns)
+                )
                 
-                for entry in entries[:max_videos]:
+                for entry in entries:
                     try:
                         # 视频ID
                         video_id = entry.find('yt:videoId', ns)
@@ -164,7 +276,21 @@ class YouTubeSpider:
                         print(f"解析视频条目失败: {e}")
                         continue
                 
+                self.feed_fetcher.record_download(rss_url, entries.bytes_read)
+                
+                if entries.stopped == 'known_id':
+                    # 其后的视频与上次保存的一致，直接沿用
+                    index = next(i for i, video in enumerate(saved_videos) if video.get('video_id') == entries.stop_id)
+                    videos = (videos + saved_videos[index:])[:max_videos]
+                    print(f"新增 {entries.count} 个视频，其余沿用上次保存的数据")
+                
                 print(f"成功获取 {len(videos)} 个视频")
+                if videos:
+                    # 提前停止时未读完响应体，按 Content-Length 估算完整大小
+                    size = entries.bytes_read
+                    if entries.stopped:
+                        size = int(response.headers.get('Content-Length') or 0) or size
+                    self.pending_validators = (response, size)
                 
             else:
                 print(f"RSS feed 请求失败，状态码: {response.status_code}")
@@ -173,6 +299,10 @@ class YouTubeSpider:
         except Exception as e:
             print(f"获取 YouTube 视频数据失败: {e}")
             return self.get_mock_data()
+        finally:
+            # 流式响应可能未读完，释放连接
+            if response is not None:
+                response.close()
         
         if not videos:
             print("未获取到任何视频，返回模拟数据")
@@ -182,6 +312,7 @@ class YouTubeSpider:
             'channel_handle': self.channel_handle,
             'channel_name': self.channel_name,
             'total_videos': len(videos),
+            'max_videos': max_videos,
             'fetched_at': datetime.now().isoformat(),
             'videos': videos
         }
@@ -228,6 +359,9 @@ class YouTubeSpider:
         
         if data and data.get('videos'):
             output_path = self.save_data(data)
+            if self.pending_validators:
+                response, size = self.pending_validators
+                self.feed_fetcher.commit(self.feed_url, response, size)
             print(f"✅ 抓取成功！共获取 {data['total_videos']} 个视频")
             print(f"📁 数据文件: {output_path}")
             
@@ -240,6 +374,11 @@ class YouTubeSpider:
         else:
             print("❌ 未能抓取到任何视频")
         
+        if self.feed_url:
+            stats = self.feed_fetcher.summary(self.feed_url)
+            print(f"RSS条件请求统计: 请求 {stats['requests']} 次，未变化 {stats['not_modified']} 次"
+                  f"（命中率 {stats['hit_rate']}），累计下载 {stats['kb_downloaded']} KB，节省 {stats['kb_saved']} KB")
+        
         return data
 
 def main():